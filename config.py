@@ -29,6 +29,10 @@ class Settings(BaseSettings):
     JTL_SQL_DATABASE: str = os.getenv("JTL_SQL_DATABASE", "eazybusiness")
     JTL_SQL_USERNAME: str = os.getenv("JTL_SQL_USERNAME", "reportsuser")
     JTL_SQL_PASSWORD: str = os.getenv("JTL_SQL_PASSWORD", "")
+    # In-process cache of batched JTL order data (seconds; misses expire sooner)
+    JTL_CACHE_TTL_SECONDS: int = int(os.getenv("JTL_CACHE_TTL_SECONDS", "900"))
+    JTL_CACHE_MISS_TTL_SECONDS: int = int(os.getenv("JTL_CACHE_MISS_TTL_SECONDS", "60"))
+    JTL_CACHE_MAX_ENTRIES: int = int(os.getenv("JTL_CACHE_MAX_ENTRIES", "100000"))
     
     # AWS S3
     AWS_ACCESS_KEY_ID: Optional[str] = os.getenv("AWS_ACCESS_KEY_ID")
@@ -50,18 +54,33 @@ class Settings(BaseSettings):
     # Browser Profile and Cookie Paths (inside ./Browser folder)
     BROWSER_DIR: str = str(ROOT_DIR / "Browser")
     BROWSER_PROFILE_DIR: str = str(ROOT_DIR / "Browser" / "profile")
-    AMAZON_COOKIE_FILE: str = str(ROOT_DIR / "Browser" / "amazonCookies.pkl")
+    AMAZON_COOKIE_FILE: str = str(ROOT_DIR / "Browser" / "amazonCookies.json")
     
     # Worker Settings
     WORKER_POLL_INTERVAL: int = int(os.getenv("WORKER_POLL_INTERVAL", "10"))
+    # Upper bound for the idle queue-poll backoff (doubles from WORKER_POLL_INTERVAL)
+    WORKER_POLL_INTERVAL_MAX: int = int(os.getenv("WORKER_POLL_INTERVAL_MAX", "60"))
     WORKER_DAYS_BACK: int = int(os.getenv("WORKER_DAYS_BACK", "90"))
+    # Label uploads to Amazon in flight at once (Amazon throttles per seller)
+    UPLOAD_CONCURRENCY: int = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+    # PNG rendering of label PDFs for Amazon (raise DPI / disable gray if Amazon rejects labels)
+    LABEL_PNG_DPI: int = int(os.getenv("LABEL_PNG_DPI", "200"))
+    LABEL_PNG_GRAYSCALE: bool = os.getenv("LABEL_PNG_GRAYSCALE", "true").lower() in ("1", "true", "yes")
     
     # Retry Settings
     RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
     RETRY_WAIT_SECONDS: int = int(os.getenv("RETRY_WAIT_SECONDS", "60"))
     RETRY_BACKOFF_MULTIPLIER: int = int(os.getenv("RETRY_BACKOFF_MULTIPLIER", "2"))
+    RETRY_WAIT_MAX: int = int(os.getenv("RETRY_WAIT_MAX", "600"))
+    SESSION_RESET_WAIT_SECONDS: int = int(os.getenv("SESSION_RESET_WAIT_SECONDS", "30"))
+    SESSION_RESET_MAX_ATTEMPTS: int = int(os.getenv("SESSION_RESET_MAX_ATTEMPTS", "3"))
+    # Amazon login retries: decorrelated-jitter backoff between base and max
+    LOGIN_MAX_ATTEMPTS: int = int(os.getenv("LOGIN_MAX_ATTEMPTS", "10"))
+    LOGIN_RETRY_BASE_WAIT: int = int(os.getenv("LOGIN_RETRY_BASE_WAIT", "5"))
+    LOGIN_RETRY_WAIT_MAX: int = int(os.getenv("LOGIN_RETRY_WAIT_MAX", "60"))
 
     # Circuit Breaker Settings
+    CIRCUIT_BREAKER_ENABLED: bool = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() in ("1", "true", "yes")
     CIRCUIT_BREAKER_THRESHOLD: int = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))
     CIRCUIT_BREAKER_RESET_TIMEOUT: int = int(os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT", "300"))
     
@@ -48,13 +48,15 @@ class JTLSession:
             if conn:
                 conn.close()
     
-    def execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    def execute_query(self, query: str, params: tuple = (), raise_errors: bool = False) -> List[Dict[str, Any]]:
         """
         Execute a query and return results as list of dicts.
         
         Args:
             query: SQL query string with ? placeholders
             params: Tuple of parameter values
+            raise_errors: Re-raise pyodbc errors instead of returning []
+                (batched lookups, where [] would read as "not found" for every order)
             
         Returns:
             List of dicts with column names as keys
@@ -70,6 +72,8 @@ class JTLSession:
                 return []
         except pyodbc.Error as e:
             logger.error(f"JTL query error: {e}")
+            if raise_errors:
+                raise
             return []
     
     def test_connection(self) -> bool:
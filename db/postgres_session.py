@@ -21,6 +21,9 @@ engine = create_engine(
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=10,
+    # psycopg2: multi-row VALUES for INSERT executemany, execute_batch for
+    # UPDATE/DELETE executemany (e.g. the ORM's per-chunk status UPDATEs)
+    executemany_mode="values_plus_batch",
     echo=False
 )
 
@@ -23,7 +23,7 @@ from typing import Optional, List
 
 from sqlalchemy import (
     Column, Integer, String, Text, Boolean, DateTime, 
-    Numeric, ForeignKey, JSON, Index
+    Numeric, ForeignKey, JSON, Index, text
 )
 from sqlalchemy.orm import relationship
 
@@ -139,6 +139,19 @@ class AmazonReturn(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Partial indexes over the small per-cycle working sets (Step 3 keyset
+    # chunks over PENDING_RMA, the Step 4 RMA_RECEIVED update)
+    __table_args__ = (
+        Index(
+            "ix_amazon_returns_pending_rma_id", "id",
+            postgresql_where=text(f"internal_status = '{InternalStatus.PENDING_RMA}'"),
+        ),
+        Index(
+            "ix_amazon_returns_rma_received_id", "id",
+            postgresql_where=text(f"internal_status = '{InternalStatus.RMA_RECEIVED}'"),
+        ),
+    )
+    
     # Relationships
     items = relationship("AmazonReturnItem", back_populates="amazon_return", cascade="all, delete-orphan")
     address = relationship("AmazonReturnAddress", back_populates="amazon_return", uselist=False, cascade="all, delete-orphan")
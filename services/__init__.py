@@ -8,7 +8,7 @@ from services.label_service import LabelService, DHLService, S3Service
 from services.upload_service import UploadService
 from services.amazon_client import AmazonClient, HTTPError, SessionExpiredError
 from services.session_manager import SessionManager, session_manager
-from services.retry_handler import RetryWithSessionReset, CircuitBreaker
+from services.retry_handler import RetryWithSessionReset, CircuitBreaker, NullCircuitBreaker
 from services.aggregation_service import AggregationService
 from services.return_flow import ReturnFlow, run_processing_cycle
 
@@ -32,6 +32,7 @@ __all__ = [
     # Retry handling
     "RetryWithSessionReset",
     "CircuitBreaker",
+    "NullCircuitBreaker",
     # Errors
     "HTTPError",
     # Orchestration
@@ -10,17 +10,33 @@ import asyncio
 import logging
 import time
 import html
-import json as json_lib
 import re
 from typing import Optional, Any, List
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+# "gzip,deflate" plus br/zstd only when brotli/zstandard are installed,
+# so we never advertise an encoding urllib3 can't decode
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 
 from config import settings
 
 logger = logging.getLogger(__name__)
 
 
+# Shared keep-alive pool for Seller Central, mounted on every session we're
+# handed so TLS connections survive session refreshes and new cycles.
+# Only failed connects are retried here (nothing was sent); status-based
+# retries are RetryHandler's job.
+_amazon_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=max(10, settings.UPLOAD_CONCURRENCY * 2),
+    max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3),
+)
+
+
 class HTTPError(Exception):
     """Raised when HTTP request fails."""
     def __init__(self, message: str, status_code: int = 0):
@@ -30,7 +46,9 @@ class HTTPError(Exception):
 
 class SessionExpiredError(Exception):
     """Raised when Amazon session has expired (4xx errors)."""
-    pass
+    def __init__(self, message: str, status_code: int = 0):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class AmazonClient:
@@ -51,10 +69,11 @@ class AmazonClient:
     
     def __init__(self, session: Optional[requests.Session] = None):
         self._session = session or requests.Session()
+        self._prepare_session(self._session)
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36",
             "Accept": "application/json, text/plain, */*",
-            "Accept-Encoding": "gzip, deflate, br",
+            "Accept-Encoding": ACCEPT_ENCODING,
             "Accept-Language": "en-US,en;q=0.9,de-DE;q=0.8,de;q=0.7",
         }
         
@@ -63,8 +82,23 @@ class AmazonClient:
         """Get current session."""
         return self._session
         
+    @property
+    def session_key(self) -> Optional[str]:
+        """Amazon session-id cookie, identifying the current seller session."""
+        if not self._session:
+            return None
+        # Iterate rather than cookies.get() - the name may exist on several domains
+        return next((c.value for c in self._session.cookies if c.name == 'session-id'), None)
+        
+    @staticmethod
+    def _prepare_session(session: requests.Session):
+        """Mount the shared pool and compression defaults for direct session.get() callers (CSRF fetch)."""
+        session.mount("https://", _amazon_adapter)
+        session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        
     def update_session(self, session: requests.Session):
         """Update the session after refresh."""
+        self._prepare_session(session)
         self._session = session
         
     async def _make_request(
@@ -92,7 +126,7 @@ class AmazonClient:
             # Check for session expiry (4xx errors)
             if 400 <= response.status_code < 500:
                 logger.warning(f"Got {response.status_code} - session expired")
-                raise SessionExpiredError(f"Session expired (HTTP {response.status_code}).")
+                raise SessionExpiredError(f"Session expired (HTTP {response.status_code}).", response.status_code)
                     
             # Check for server errors (5xx)
             if response.status_code >= 500:
@@ -134,7 +168,7 @@ class AmazonClient:
             logger.error(f"API Error: {response.status_code} - {response.text[:500]}")
             raise HTTPError(f"Amazon API returned {response.status_code}", response.status_code)
             
-        return response.json()
+        return orjson.loads(response.content)
         
     async def fetch_all_returns(
         self,
@@ -201,7 +235,7 @@ class AmazonClient:
                 logger.error(f"Failed to get routing details: {response.status_code} - {response.text[:200]}")
                 return None
             
-            return response.json()
+            return orjson.loads(response.content)
         except SessionExpiredError:
             raise
         except Exception as e:
@@ -225,7 +259,7 @@ class AmazonClient:
             response = await self._make_request('GET', url)
             
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             return None
             
         except Exception as e:
@@ -248,7 +282,7 @@ class AmazonClient:
             response = await self._make_request('GET', url)
             
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             return None
             
         except Exception as e:
@@ -263,7 +297,12 @@ class AmazonClient:
         return_request_id: str,
         csrf: str,
     ) -> Optional[dict]:
-        """Get arguments for Alexandria document upload."""
+        """
+        Get arguments for Alexandria document upload.
+        
+        SessionExpiredError (4xx, e.g. a stale CSRF token) propagates so
+        the caller can refresh the token; other failures return None.
+        """
         url = (
             f"{self.BASE_URL}{self.ALEXANDRIA_ARGS_API}"
             f"?customerId={customer_id}"
@@ -284,9 +323,11 @@ class AmazonClient:
             response = await self._make_request('GET', url, headers=headers)
             
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             return None
             
+        except SessionExpiredError:
+            raise
         except Exception as e:
             logger.error(f"Failed to get Alexandria args: {e}")
             return None
@@ -301,7 +342,12 @@ class AmazonClient:
         return_request_id: str,
         csrf: str,
     ) -> Optional[dict]:
-        """Upload document to Alexandria service."""
+        """
+        Upload document to Alexandria service.
+        
+        SessionExpiredError (4xx, e.g. a stale CSRF token) propagates so
+        the caller can refresh the token; other failures return success=False.
+        """
         alexandria_args = alex_args.get('alexandriaArguments', {})
         upload_url = alexandria_args.get('Upload_URL')
         
@@ -345,7 +391,7 @@ class AmazonClient:
                 if match:
                     decoded = html.unescape(match.group(1))
                     try:
-                        upload_data = json_lib.loads(decoded)
+                        upload_data = orjson.loads(decoded)
                         doc_id = upload_data.get('content', {}).get('documentUploadResponseList', {}).get('file', {}).get('content', {}).get('documentId')
                         if doc_id:
                             logger.info(f"[Alexandria] ✅ Upload successful. DocVersionId: {doc_id}")
@@ -366,6 +412,8 @@ class AmazonClient:
             logger.error(f"[Alexandria] ❌ Upload failed. Response: {response_text[:500]}")
             return {"success": False, "doc_version_id": None}
             
+        except SessionExpiredError:
+            raise
         except Exception as e:
             logger.error(f"[Alexandria] ❌ Upload error: {e}")
             return {"success": False, "doc_version_id": None}
@@ -377,7 +425,12 @@ class AmazonClient:
         key: str,
         csrf: str,
     ) -> bool:
-        """Upload label to Amazon S3 bucket."""
+        """
+        Upload label to Amazon S3 bucket.
+        
+        Raises on failure (instead of returning False) so a concurrently
+        running Alexandria upload gets cancelled.
+        """
         url = f"https://{s3_args['bucketName']}.s3.amazonaws.com"
         
         files = {"file": ("label.png", label_binary, "image/png")}
@@ -400,16 +453,13 @@ class AmazonClient:
             "Referer": f"{self.BASE_URL}/",
         }
         
-        try:
-            response = await self._make_request('POST', url, data=data, files=files, headers=headers)
-            
-            success = response.status_code in [200, 201, 204]
-            logger.info(f"S3 Upload Status: {response.status_code} - {'Success' if success else 'Failed'}")
-            return success
-            
-        except Exception as e:
-            logger.error(f"S3 upload failed: {e}")
-            return False
+        response = await self._make_request('POST', url, data=data, files=files, headers=headers)
+        
+        success = response.status_code in [200, 201, 204]
+        logger.info(f"S3 Upload Status: {response.status_code} - {'Success' if success else 'Failed'}")
+        if not success:
+            raise HTTPError(f"S3 upload to Amazon failed: {response.status_code}", response.status_code)
+        return True
             
     async def complete_return(
         self,
@@ -421,7 +471,12 @@ class AmazonClient:
         tracking_id: str,
         csrf: str,
     ) -> bool:
-        """Complete return by submitting label to Amazon."""
+        """
+        Complete return by submitting label to Amazon.
+        
+        SessionExpiredError (4xx, e.g. a stale CSRF token) propagates so
+        the caller can refresh the token; other failures return False.
+        """
         url = f"{self.BASE_URL}/returns/update-return-request-v2"
         
         payload = {
@@ -449,7 +504,7 @@ class AmazonClient:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36",
             "Accept": "application/json, text/plain, */*",
-            "Accept-Encoding": "gzip, deflate, br",
+            "Accept-Encoding": ACCEPT_ENCODING,
             "Accept-Language": "en-US,en;q=0.9,de-DE;q=0.8,de;q=0.7",
             "Anti-Csrftoken-A2z": csrf,
             "Content-Type": "application/json;charset=UTF-8",
@@ -468,7 +523,7 @@ class AmazonClient:
             logger.info(f"[Complete] Response status: {response.status_code}")
             
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 success = result.get('succeeded', False)
                 
                 if success:
@@ -482,6 +537,8 @@ class AmazonClient:
                 logger.error(f"[Complete] ❌ HTTP {response.status_code}: {response.text[:500]}")
                 return False
             
+        except SessionExpiredError:
+            raise
         except Exception as e:
             logger.error(f"[Complete] ❌ Error: {e}")
             return False
@@ -12,7 +12,8 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Tuple, Set
 from collections import defaultdict
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
 
 from models.amazon_return import (
     AmazonReturn, AmazonReturnItem,
@@ -82,7 +83,10 @@ class FilterService:
         """Get all returns that are ready for label generation."""
         eligible = []
         
-        returns = self.db.query(AmazonReturn).filter(
+        # is_eligible_for_processing reads ret.address - load them in one SELECT
+        returns = self.db.query(AmazonReturn).options(
+            selectinload(AmazonReturn.address)
+        ).filter(
             AmazonReturn.internal_status.in_([
                 InternalStatus.RMA_RECEIVED,
             ]),
@@ -114,6 +118,10 @@ class FilterService:
         3. Older returns include ALL statuses EXCEPT DUPLICATE_CLOSED and NOT_ELIGIBLE
         4. If duplicate found, mark as DUPLICATE_CLOSED
         
+        Only (order_id, asin) pairs shared by more than one return (one
+        GROUP BY query up front) get the older-return lookup, which runs
+        against those pairs' returns bucketed in memory (one more query).
+        
         Returns (duplicates_found, duplicates_marked).
         """
         from sqlalchemy import and_
@@ -122,7 +130,9 @@ class FilterService:
         logger.info("Detecting duplicate returns...")
         
         # Get all returns to check for duplicates
-        returns_to_check = self.db.query(AmazonReturn).filter(
+        returns_to_check = self.db.query(AmazonReturn).options(
+            selectinload(AmazonReturn.items)
+        ).filter(
             AmazonReturn.internal_status.in_([
                 InternalStatus.NO_RMA_FOUND,
                 InternalStatus.RMA_RECEIVED,
@@ -131,8 +141,15 @@ class FilterService:
         
         logger.info(f"Checking {len(returns_to_check)} returns for duplicates")
         
+        # A pair held by only one return can't be a duplicate - skip its lookup
+        candidate_pairs = self._shared_order_asin_pairs({ret.order_id for ret in returns_to_check})
+        returns_by_pair = self._returns_by_order_asin(candidate_pairs)
+        
         duplicates_marked = 0
         duplicate_groups = set()
+        # Buckets are loaded once - returns closed in this pass must drop out
+        # of later lookups, or tied returns would close each other
+        closed_ids: Set[int] = set()
         
         for ret in returns_to_check:
             # Check each ASIN in this return
@@ -141,22 +158,19 @@ class FilterService:
             duplicate_asin = None
             
             for item in ret.items:
-                # Find if there's an older return with same (order_id, asin)
-                older_return = (
-                    self.db.query(AmazonReturn)
-                    .join(AmazonReturnItem)
-                    .filter(
-                        AmazonReturn.order_id == ret.order_id,
-                        AmazonReturnItem.asin == item.asin,
-                        AmazonReturn.id != ret.id,
-                        AmazonReturn.return_request_date <= ret.return_request_date,
-                        AmazonReturn.internal_status.notin_([
-                            InternalStatus.DUPLICATE_CLOSED
-                        ])
-                    )
-                    .order_by(AmazonReturn.return_request_date)
-                    .first()
-                )
+                if (ret.order_id, item.asin) not in candidate_pairs:
+                    continue
+                
+                # Find if there's an older return with same (order_id, asin);
+                # buckets are sorted oldest first, so the first hit is the oldest
+                older_return = None
+                if ret.return_request_date is not None:
+                    for other in returns_by_pair.get((ret.order_id, item.asin), ()):
+                        if other.return_request_date > ret.return_request_date:
+                            break
+                        if other.id != ret.id and other.id not in closed_ids:
+                            older_return = other
+                            break
                 
                 if older_return:
                     is_duplicate = True
@@ -172,6 +186,7 @@ class FilterService:
                 # Mark as duplicate
                 ret.internal_status = InternalStatus.DUPLICATE_CLOSED
                 ret.last_error = f"ASIN {duplicate_asin} already in {duplicate_of.return_request_id}"
+                closed_ids.add(ret.id)
                 duplicates_marked += 1
                 
                 logger.info(
@@ -186,6 +201,71 @@ class FilterService:
         return len(duplicate_groups), duplicates_marked
     
 
+    def _shared_order_asin_pairs(self, order_ids: Set[str]) -> Set[Tuple[str, str]]:
+        """
+        Get (order_id, asin) pairs that appear in more than one return.
+        
+        Counts the same returns the older-return lookup considers
+        (everything except DUPLICATE_CLOSED), so every real duplicate
+        is among the returned pairs.
+        """
+        order_ids.discard(None)
+        if not order_ids:
+            return set()
+        
+        rows = (
+            self.db.query(AmazonReturn.order_id, AmazonReturnItem.asin)
+            .join(AmazonReturnItem)
+            .filter(
+                AmazonReturn.order_id.in_(order_ids),
+                AmazonReturn.internal_status.notin_([
+                    InternalStatus.DUPLICATE_CLOSED
+                ])
+            )
+            .group_by(AmazonReturn.order_id, AmazonReturnItem.asin)
+            .having(func.count(func.distinct(AmazonReturn.id)) > 1)
+            .all()
+        )
+        return {(order_id, asin) for order_id, asin in rows}
+
+    def _returns_by_order_asin(self, pairs: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], List]:
+        """
+        Get the returns holding each (order_id, asin) pair, oldest first.
+        
+        Same candidates as a per-item older-return query: everything except
+        DUPLICATE_CLOSED, and only dated returns (a NULL return_request_date
+        never compares as older). Rows carry id, return_request_id and
+        return_request_date.
+        """
+        if not pairs:
+            return {}
+        
+        rows = (
+            self.db.query(
+                AmazonReturn.id,
+                AmazonReturn.return_request_id,
+                AmazonReturn.return_request_date,
+                AmazonReturn.order_id,
+                AmazonReturnItem.asin,
+            )
+            .join(AmazonReturnItem)
+            .filter(
+                AmazonReturn.order_id.in_({order_id for order_id, _ in pairs}),
+                AmazonReturn.return_request_date.isnot(None),
+                AmazonReturn.internal_status.notin_([
+                    InternalStatus.DUPLICATE_CLOSED
+                ])
+            )
+            .order_by(AmazonReturn.return_request_date)
+            .all()
+        )
+        
+        grouped = defaultdict(list)
+        for row in rows:
+            if (row.order_id, row.asin) in pairs:
+                grouped[(row.order_id, row.asin)].append(row)
+        return grouped
+
     def _delete_order_details(self, return_id: int):
         """
         Delete all order details for a return.
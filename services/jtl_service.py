@@ -5,14 +5,23 @@ Runs locally on JTL server, no HTTP polling needed.
 Adapted from ex_JTL-worker/worker.py OrderDataFetcher class.
 """
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from db.jtl_session import jtl_session
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Max order IDs per IN (...) query (SQL Server caps a statement at 2100 parameters)
+JTL_IN_BATCH_SIZE = 500
+
+
+def _in_clause(count: int) -> str:
+    """Build an 'IN (?, ?, ...)' condition with `count` placeholders."""
+    return f"IN ({', '.join(['?'] * count)})"
+
 
 class JTLService:
     """
@@ -24,6 +33,8 @@ class JTLService:
     
     def __init__(self):
         self.jtl = jtl_session
+        # order_id -> (expires_at, order data) for get_all_order_data_batch
+        self._order_data_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
     
     def _serialize_value(self, value: Any) -> Any:
         """Serialize value for JSON (handle datetime, etc.)."""
@@ -110,9 +121,67 @@ class JTLService:
         logger.warning(f"    RMA not found in either direct or text field lookup")
         return None
     
-    def get_general_order_details(self, order_id: str) -> List[Dict[str, Any]]:
-        """Retrieves general order details like buyer info, status, and items."""
-        sql = """
+    def lookup_rma_batch(self, order_ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Two-tier RMA lookup for many orders at once.
+        
+        Same rules as lookup_rma_enhanced (direct match first, text fields
+        as fallback), but with one IN (...) query per tier and batch.
+        
+        Args:
+            order_ids: Amazon order IDs
+            
+        Returns:
+            Dict of order ID -> JTL AU number (None if not found)
+            
+        Raises:
+            pyodbc.Error: If a JTL query fails (nothing is reported as not found)
+        """
+        first_rows: Dict[str, Optional[str]] = {}
+        
+        # Check 1: Direct match in tAuftrag (first row per order, like lookup_rma)
+        for start in range(0, len(order_ids), JTL_IN_BATCH_SIZE):
+            chunk = order_ids[start:start + JTL_IN_BATCH_SIZE]
+            query = f"""
+                SELECT a.cExterneAuftragsnummer, a.cAuftragsNr
+                FROM Verkauf.tAuftrag a
+                WHERE a.cExterneAuftragsnummer {_in_clause(len(chunk))}
+            """
+            for row in self.jtl.execute_query(query, tuple(chunk), raise_errors=True):
+                order_key = (row.get('cExterneAuftragsnummer') or '').strip()
+                first_rows.setdefault(order_key, row.get('cAuftragsNr'))
+        
+        rmas: Dict[str, Optional[str]] = {
+            order_id: (first_rows.get(order_id) or '').strip() or None
+            for order_id in order_ids
+        }
+        
+        # Check 2: Text field matches for orders without a direct hit
+        missing = [order_id for order_id, rma in rmas.items() if not rma]
+        text_rows: Dict[str, Optional[str]] = {}
+        for start in range(0, len(missing), JTL_IN_BATCH_SIZE):
+            chunk = missing[start:start + JTL_IN_BATCH_SIZE]
+            in_clause = _in_clause(len(chunk))
+            query = f"""
+                SELECT t.cAnmerkung, t.cHinweis, a.cAuftragsNr
+                FROM Verkauf.tAuftragText t
+                JOIN Verkauf.tAuftrag a ON a.kAuftrag = t.kAuftrag
+                WHERE t.cAnmerkung {in_clause} OR t.cHinweis {in_clause}
+            """
+            wanted = set(chunk)
+            for row in self.jtl.execute_query(query, tuple(chunk) * 2, raise_errors=True):
+                for field in ('cAnmerkung', 'cHinweis'):
+                    order_key = (row.get(field) or '').strip()
+                    if order_key in wanted:
+                        text_rows.setdefault(order_key, row.get('cAuftragsNr'))
+        
+        for order_id in missing:
+            rmas[order_id] = (text_rows.get(order_id) or '').strip() or None
+        
+        return rmas
+    
+    # Order detail queries; {cond} is "= ?" for one order or an IN (...) list
+    _GENERAL_DETAILS_SQL = """
         SELECT 
             Amz.cOrderId,
             Amz.dPurchaseDate,
@@ -140,15 +209,12 @@ class JTLService:
                                             AND Listing.kUser = Amz.kUser 
                                             AND Listing.nPlattform = Platt.kPlattform
         WHERE 
-            Amz.cOrderId = ?
+            Amz.cOrderId {cond}
         """
-        results = self.jtl.execute_query(sql, (order_id,))
-        return [self._serialize_dict(r) for r in results]
     
-    def get_product_descriptions(self, order_id: str) -> List[Dict[str, Any]]:
-        """Retrieves product descriptions, manufacturer info, and identifiers."""
-        sql = """
+    _PRODUCT_DESCRIPTIONS_SQL = """
         SELECT 
+            Amz.cOrderId,
             Pos.cArtNr AS SKU,
             Art.kArtikel AS Internal_ID,
             Desc_Wawi.cName AS Display_Name,
@@ -170,15 +236,12 @@ class JTLService:
                                                 AND Desc_Wawi.kPlattform = 1 
                                                 AND Desc_Wawi.kSprache = 1
         WHERE 
-            Amz.cOrderId = ?
+            Amz.cOrderId {cond}
         """
-        results = self.jtl.execute_query(sql, (order_id,))
-        return [self._serialize_dict(r) for r in results]
     
-    def get_product_specs(self, order_id: str) -> List[Dict[str, Any]]:
-        """Retrieves product characteristics (Merkmale)."""
-        sql = """
+    _PRODUCT_SPECS_SQL = """
         SELECT 
+            Amz.cOrderId,
             Pos.cArtNr AS SKU,
             MerkLang.cName AS Spec_Name,
             WertLang.cWert AS Spec_Value
@@ -197,15 +260,12 @@ class JTLService:
             dbo.tMerkmalWertSprache AS WertLang ON WertLang.kMerkmalWert = ArtMerk.kMerkmalWert
                                                 AND WertLang.kSprache = 1
         WHERE 
-            Amz.cOrderId = ?
+            Amz.cOrderId {cond}
         """
-        results = self.jtl.execute_query(sql, (order_id,))
-        return [self._serialize_dict(r) for r in results]
     
-    def get_product_attributes(self, order_id: str) -> List[Dict[str, Any]]:
-        """Retrieves product attributes."""
-        sql = """
+    _PRODUCT_ATTRIBUTES_SQL = """
         SELECT 
+            Amz.cOrderId,
             Pos.cArtNr AS SKU,
             AttrLang.cName AS Attribute_Name,
             ValLang.cWertVarchar AS Attribute_Value
@@ -224,16 +284,13 @@ class JTLService:
             dbo.tArtikelAttributSprache AS ValLang ON ValLang.kArtikelAttribut = ArtAttr.kArtikelAttribut
                                                 AND ValLang.kSprache = 1
         WHERE 
-            Amz.cOrderId = ?
+            Amz.cOrderId {cond}
             AND AttrLang.cName != 'TPMS Hinweise'
         """
-        results = self.jtl.execute_query(sql, (order_id,))
-        return [self._serialize_dict(r) for r in results]
     
-    def get_tracking_info(self, order_id: str) -> List[Dict[str, Any]]:
-        """Retrieves tracking details."""
-        sql = """
+    _TRACKING_INFO_SQL = """
         SELECT 
+            Auftrag.cExterneAuftragsnummer AS cOrderId,
             Versand.cIdentCode AS Tracking_Number,
             Versand.kLogistik AS Carrier,
             Versand.dVersendet AS Shipped_Date,
@@ -246,11 +303,57 @@ class JTLService:
         JOIN 
             dbo.tVersand AS Versand ON Versand.kLieferschein = Lieferschein.kLieferschein
         WHERE 
-            Auftrag.cExterneAuftragsnummer = ?
+            Auftrag.cExterneAuftragsnummer {cond}
         """
-        results = self.jtl.execute_query(sql, (order_id,))
+    
+    def _query_single_order(self, sql_template: str, order_id: str) -> List[Dict[str, Any]]:
+        """Run an order detail query for one order ID."""
+        results = self.jtl.execute_query(sql_template.format(cond="= ?"), (order_id,))
         return [self._serialize_dict(r) for r in results]
     
+    def _query_grouped_by_order(self, sql_template: str, order_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Run an order detail query for many order IDs with IN (...) batches.
+        
+        Rows keep pyodbc's native values (e.g. datetime), since the batch
+        results go straight into the ORM inserts rather than to JSON.
+        
+        Args:
+            sql_template: One of the *_SQL templates (must select cOrderId)
+            order_ids: Amazon order IDs
+            
+        Returns:
+            Dict of order ID -> rows, in query order
+        """
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for start in range(0, len(order_ids), JTL_IN_BATCH_SIZE):
+            chunk = order_ids[start:start + JTL_IN_BATCH_SIZE]
+            sql = sql_template.format(cond=_in_clause(len(chunk)))
+            for row in self.jtl.execute_query(sql, tuple(chunk), raise_errors=True):
+                order_key = (row.get('cOrderId') or '').strip()
+                grouped.setdefault(order_key, []).append(row)
+        return grouped
+    
+    def get_general_order_details(self, order_id: str) -> List[Dict[str, Any]]:
+        """Retrieves general order details like buyer info, status, and items."""
+        return self._query_single_order(self._GENERAL_DETAILS_SQL, order_id)
+    
+    def get_product_descriptions(self, order_id: str) -> List[Dict[str, Any]]:
+        """Retrieves product descriptions, manufacturer info, and identifiers."""
+        return self._query_single_order(self._PRODUCT_DESCRIPTIONS_SQL, order_id)
+    
+    def get_product_specs(self, order_id: str) -> List[Dict[str, Any]]:
+        """Retrieves product characteristics (Merkmale)."""
+        return self._query_single_order(self._PRODUCT_SPECS_SQL, order_id)
+    
+    def get_product_attributes(self, order_id: str) -> List[Dict[str, Any]]:
+        """Retrieves product attributes."""
+        return self._query_single_order(self._PRODUCT_ATTRIBUTES_SQL, order_id)
+    
+    def get_tracking_info(self, order_id: str) -> List[Dict[str, Any]]:
+        """Retrieves tracking details."""
+        return self._query_single_order(self._TRACKING_INFO_SQL, order_id)
+    
     def _normalize_to_single(self, items: List[Dict[str, Any]], key_field: str = None) -> List[Dict[str, Any]]:
         """
         Normalize a list to contain only one element.
@@ -362,6 +465,84 @@ class JTLService:
         
         return data
     
+    def get_all_order_data_batch(self, order_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch all order data for many orders with batched IN (...) queries.
+        
+        Returns the same per-order structure as get_all_order_data (with
+        native column values instead of JSON-serialized ones), but issues
+        one query per table and batch instead of one per order.
+        Results are cached in-process for JTL_CACHE_TTL_SECONDS (orders
+        without an RMA only for JTL_CACHE_MISS_TTL_SECONDS), so orders
+        seen again shortly after - e.g. a retried chunk or a second
+        return on the same order - skip the round trips.
+        
+        Args:
+            order_ids: Amazon order IDs (duplicates and empty values ignored)
+            
+        Returns:
+            Dict of order ID -> order data dict (see get_all_order_data)
+            
+        Raises:
+            pyodbc.Error: If any JTL query fails; nothing is cached then
+        """
+        order_ids = list(dict.fromkeys(order_id for order_id in order_ids if order_id))
+        if not order_ids:
+            return {}
+        
+        now = time.monotonic()
+        data = {}
+        for order_id in order_ids:
+            cached = self._order_data_cache.get(order_id)
+            if cached and cached[0] > now:
+                data[order_id] = cached[1]
+        if data:
+            logger.info(f"  {len(data)}/{len(order_ids)} orders served from JTL cache")
+            order_ids = [order_id for order_id in order_ids if order_id not in data]
+            if not order_ids:
+                return data
+        
+        logger.info(f"  Fetching all data for {len(order_ids)} orders (batched)")
+        
+        raw_general = self._query_grouped_by_order(self._GENERAL_DETAILS_SQL, order_ids)
+        raw_descriptions = self._query_grouped_by_order(self._PRODUCT_DESCRIPTIONS_SQL, order_ids)
+        raw_specs = self._query_grouped_by_order(self._PRODUCT_SPECS_SQL, order_ids)
+        raw_attributes = self._query_grouped_by_order(self._PRODUCT_ATTRIBUTES_SQL, order_ids)
+        raw_tracking = self._query_grouped_by_order(self._TRACKING_INFO_SQL, order_ids)
+        rmas = self.lookup_rma_batch(order_ids)
+        
+        fetched = {}
+        for order_id in order_ids:
+            fetched[order_id] = {
+                "internal_rma": rmas.get(order_id),
+                "general_details": self._normalize_to_single(raw_general.get(order_id, []), "cOrderId"),
+                "product_descriptions": self._normalize_to_single(raw_descriptions.get(order_id, []), "SKU"),
+                "product_specs": self._deduplicate_list(raw_specs.get(order_id, []), ["SKU", "Spec_Name", "Spec_Value"]),
+                "product_attributes": self._normalize_to_single(raw_attributes.get(order_id, []), "SKU"),
+                "tracking_info": self._normalize_to_single(raw_tracking.get(order_id, []), "Tracking_Number"),
+            }
+        
+        found = sum(1 for order_data in fetched.values() if order_data["internal_rma"])
+        logger.info(f"    RMA found for {found}/{len(order_ids)} orders")
+        
+        self._cache_order_data(fetched, now)
+        data.update(fetched)
+        return data
+    
+    def _cache_order_data(self, fetched: Dict[str, Dict[str, Any]], now: float):
+        """Store freshly fetched order data, evicting expired entries when full."""
+        cache = self._order_data_cache
+        if len(cache) + len(fetched) > settings.JTL_CACHE_MAX_ENTRIES:
+            for order_id in [k for k, (expires_at, _) in cache.items() if expires_at <= now]:
+                del cache[order_id]
+            if len(cache) + len(fetched) > settings.JTL_CACHE_MAX_ENTRIES:
+                cache.clear()
+        
+        hit_expires_at = now + settings.JTL_CACHE_TTL_SECONDS
+        miss_expires_at = now + settings.JTL_CACHE_MISS_TTL_SECONDS
+        for order_id, order_data in fetched.items():
+            cache[order_id] = (hit_expires_at if order_data["internal_rma"] else miss_expires_at, order_data)
+    
     def test_connection(self) -> bool:
         """Test JTL database connection."""
         return self.jtl.test_connection()
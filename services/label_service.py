@@ -8,18 +8,32 @@ Handles:
 - Updating AmazonReturnGeneratedLabel records
 """
 
+import asyncio
 import logging
 import base64
-from datetime import datetime
-from typing import Optional, List
+import io
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, List, Tuple
 
+import orjson
 import requests
-from sqlalchemy.orm import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sqlalchemy import and_, not_
+from sqlalchemy.orm import Session, contains_eager, selectinload
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 from models.amazon_return import (
     AmazonReturn,
+    AmazonReturnAddress,
     AmazonReturnGeneratedLabel,
     InternalStatus,
     LabelState,
@@ -28,6 +42,97 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Max labels generated in parallel (DHL API + S3 upload are network-bound)
+MAX_CONCURRENT_LABELS = 20
+
+# Pending label writes are flushed to Postgres every N generated labels
+LABEL_FLUSH_BATCH_SIZE = 100
+
+# DHL tokens are refreshed this long before their reported expiry
+DHL_TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+# DHL receiver ID per shipper country (falls back to the German returns warehouse)
+DEFAULT_RECEIVER_ID = 'RetourenLager01'
+RECEIVER_IDS = MappingProxyType({
+    'DE': 'RetourenLager01',  # Germany
+    'CH': 'che',              # Switzerland
+    'IT': 'ita',              # Italy
+    'FR': 'fra',              # France
+    'GB': 'gbr',              # Great Britain
+    'AT': 'aut',              # Austria
+    'NL': 'nld',              # Netherlands
+    'BE': 'bel',              # Belgium
+    'ES': 'esp',              # Spain
+    'PL': 'pol',              # Poland
+    'CZ': 'cze',              # Czech Republic
+    'SK': 'svk',              # Slovakia
+    'HU': 'hun',              # Hungary
+    'RO': 'rou',              # Romania
+    'HR': 'hrv',              # Croatia
+    'SI': 'svn',              # Slovenia
+    'BG': 'bgr',              # Bulgaria
+    'EE': 'est',              # Estonia
+    'LV': 'lva',              # Latvia
+    'LT': 'ltu',              # Lithuania
+    'FI': 'fin',              # Finland
+    'SE': 'swe',              # Sweden
+    'DK': 'dnk',              # Denmark
+    'IE': 'irl',              # Ireland
+    'PT': 'prt',              # Portugal
+    'GR': 'grc',              # Greece
+    'CY': 'cyp',              # Cyprus
+    'LU': 'lux',              # Luxembourg
+    'MT': 'mlt',              # Malta
+})
+
+
+@lru_cache(maxsize=64)
+def _receiver_id(country_code: str) -> str:
+    """Cached country code -> DHL receiver ID lookup."""
+    return RECEIVER_IDS.get(country_code, DEFAULT_RECEIVER_ID)
+
+
+def _complete_address_clauses() -> list:
+    """SQL predicates matching addresses with the fields DHL requires (name, city, postal code)."""
+    return [
+        column.isnot(None) & (column != "")
+        for column in (
+            AmazonReturnAddress.name,
+            AmazonReturnAddress.city,
+            AmazonReturnAddress.postal_code,
+        )
+    ]
+
+
+# Splits "Street name 12a" into ("Street name", "12a") - last token must contain a digit
+ADDRESS_HOUSE_NUMBER_RE = re.compile(r"^(.*?)\s+(\S*\d\S*)\s*$")
+
+# Transient DHL failures are retried with exponential backoff - but only ones where
+# the shipment POST can't have created a label yet: failed connects, 429 and 503.
+# Read timeouts and 500/502/504 may follow a created shipment, so they aren't retried.
+_dhl_retry = Retry(
+    total=4,
+    connect=4,
+    read=0,
+    backoff_factor=0.5,
+    status_forcelist=[429, 503],
+    allowed_methods=["POST"],
+    raise_on_status=False,
+)
+
+# Shared HTTP session for DHL API calls - pooled connections are reused across cycles
+_dhl_session = requests.Session()
+_dhl_session.mount("https://", HTTPAdapter(
+    max_retries=_dhl_retry,
+    pool_connections=MAX_CONCURRENT_LABELS,
+    pool_maxsize=MAX_CONCURRENT_LABELS,
+))
+
+
+class LabelGenerationError(Exception):
+    """Raised when a DHL label can't be created or stored for a return."""
+    pass
+
 
 class DHLService:
     """
@@ -47,45 +152,19 @@ class DHLService:
         self.client_secret = settings.DHL_CLIENT_SECRET
         self.access_token: Optional[str] = None
         self._token_expires_at: Optional[datetime] = None
+        self._token_lock = asyncio.Lock()
     
     @staticmethod
     def get_receiver_id(country_code: str) -> str:
         """Get DHL receiver ID based on country code."""
-        COUNTRY_MAPPING = {
-            'DE': 'RetourenLager01',  # Germany
-            'CH': 'che',              # Switzerland
-            'IT': 'ita',              # Italy
-            'FR': 'fra',              # France
-            'GB': 'gbr',              # Great Britain
-            'AT': 'aut',              # Austria
-            'NL': 'nld',              # Netherlands
-            'BE': 'bel',              # Belgium
-            'ES': 'esp',              # Spain
-            'PL': 'pol',              # Poland
-            'CZ': 'cze',              # Czech Republic
-            'SK': 'svk',              # Slovakia
-            'HU': 'hun',              # Hungary
-            'RO': 'rou',              # Romania
-            'HR': 'hrv',              # Croatia
-            'SI': 'svn',              # Slovenia
-            'BG': 'bgr',              # Bulgaria
-            'EE': 'est',              # Estonia
-            'LV': 'lva',              # Latvia
-            'LT': 'ltu',              # Lithuania
-            'FI': 'fin',              # Finland
-            'SE': 'swe',              # Sweden
-            'DK': 'dnk',              # Denmark
-            'IE': 'irl',              # Ireland
-            'PT': 'prt',              # Portugal
-            'GR': 'grc',              # Greece
-            'CY': 'cyp',              # Cyprus
-            'LU': 'lux',              # Luxembourg
-            'MT': 'mlt',              # Malta
-        }
-        return COUNTRY_MAPPING.get(country_code, 'RetourenLager01')
+        return _receiver_id(country_code)
 
+    async def _post(self, url: str, **kwargs) -> requests.Response:
+        """Run a blocking POST in the thread pool so the event loop stays free."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: _dhl_session.post(url, **kwargs))
         
-    def _get_access_token(self) -> Optional[str]:
+    async def _get_access_token(self) -> Optional[str]:
         """Get DHL OAuth access token using ROPC flow."""
         logger.info("[DHL AUTH] Requesting access token...")
         
@@ -107,11 +186,16 @@ class DHLService:
         }
         
         try:
-            response = requests.post(self.TOKEN_URL, data=data, headers=headers, timeout=30)
+            response = await self._post(self.TOKEN_URL, data=data, headers=headers, timeout=30)
             response.raise_for_status()
             
-            token_data = response.json()
+            token_data = orjson.loads(response.content)
             self.access_token = token_data.get('access_token')
+            expires_in = token_data.get('expires_in')
+            self._token_expires_at = (
+                datetime.utcnow() + timedelta(seconds=max(0, int(expires_in) - DHL_TOKEN_REFRESH_MARGIN_SECONDS))
+                if expires_in else None
+            )
             logger.info(f"[DHL AUTH] ✅ Token obtained, expires in {token_data.get('expires_in')} seconds")
             return self.access_token
             
@@ -119,11 +203,21 @@ class DHLService:
             logger.error(f"[DHL AUTH] ❌ Failed to get token: {e}")
             return None
     
-    def _ensure_token(self) -> bool:
-        """Ensure we have a valid access token."""
+    def _token_valid(self) -> bool:
+        """Whether the cached access token exists and isn't about to expire."""
         if not self.access_token:
-            return self._get_access_token() is not None
-        return True
+            return False
+        return self._token_expires_at is None or datetime.utcnow() < self._token_expires_at
+    
+    async def _ensure_token(self) -> bool:
+        """Ensure we have a valid access token (fetched once, even under concurrent callers)."""
+        if self._token_valid():
+            return True
+        async with self._token_lock:
+            if not self._token_valid():
+                self.access_token = None
+                await self._get_access_token()
+            return self.access_token is not None
         
     async def create_return_shipment(
         self,
@@ -139,7 +233,7 @@ class DHLService:
         """Create a DHL return shipment and get label."""
         logger.info(f"[DHL] Creating return shipment for {shipper_name}")
         
-        if not self._ensure_token():
+        if not await self._ensure_token():
             logger.error("[DHL] ❌ Failed to obtain DHL access token")
             return None
         
@@ -170,7 +264,7 @@ class DHLService:
         
         # Build DHL API payload
         payload = {
-            "receiverId": DHLService.get_receiver_id(shipper_country),
+            "receiverId": _receiver_id(shipper_country),
             "shipper": shipper_data,
             "customsDetails": {
                 "items": customs_items
@@ -197,18 +291,25 @@ class DHLService:
         logger.info(f"[DHL API] Shipper: {shipper_data['name1']}, {shipper_data['city']}")
         
         try:
-            response = requests.post(self.RETURNS_URL, json=payload, headers=headers, timeout=30)
+            response = await self._post(self.RETURNS_URL, data=orjson.dumps(payload), headers=headers, timeout=30)
 
             logger.info(f"[DHL API] Response Status: {response.status_code}")
             
             if response.status_code in [200, 201]:
-                data = response.json()
-                label_b64 = data.get('label', {}).get('b64', '')
+                data = orjson.loads(response.content)
+                # Drop the raw body before decoding - otherwise body, base64 str and PDF bytes
+                # are all resident at once
+                response.close()
+                del response
+                
+                # Pop the base64 label out of the response so only the decoded bytes stay resident
+                label_b64 = (data.get('label') or {}).pop('b64', '')
+                label_data = base64.b64decode(label_b64) if label_b64 else b""
+                del label_b64
                 
                 result = {
                     "tracking_number": data.get("shipmentNo"),
-                    "label_b64": label_b64,
-                    "label_data": base64.b64decode(label_b64) if label_b64 else b"",
+                    "label_data": label_data,
                     "international_tracking": data.get("internationalShipmentNo"),
                     "routing_code": data.get("routingCode"),
                     "status": "CREATED"
@@ -225,25 +326,52 @@ class DHLService:
             return None
 
 
+# Process-wide S3 client (boto3 clients are thread-safe and expensive to build)
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+# Large labels (customs docs) go up as 5 MB multipart chunks instead of one in-memory PUT
+_s3_transfer_config = TransferConfig(
+    multipart_threshold=5 * 1024 * 1024,
+    multipart_chunksize=5 * 1024 * 1024,
+    use_threads=True,
+)
+
+# Dedicated pool for blocking S3 transfers, sized above MAX_CONCURRENT_LABELS
+_s3_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="s3-upload")
+
+
+def _get_s3_client():
+    """Lazily create the shared S3 client with a connection pool sized for concurrent uploads."""
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = boto3.client(
+                    's3',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_REGION,
+                    config=Config(
+                        max_pool_connections=50,
+                        retries={'max_attempts': 5, 'mode': 'adaptive'},
+                        tcp_keepalive=True,
+                    ),
+                )
+    return _s3_client
+
+
 class S3Service:
     """AWS S3 service for storing DHL labels."""
     
     def __init__(self):
         self.bucket_name = settings.S3_BUCKET_NAME
         self.region = settings.AWS_REGION
-        self._client = None
         
     @property
     def client(self):
-        """Lazy initialization of S3 client."""
-        if self._client is None:
-            self._client = boto3.client(
-                's3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=self.region
-            )
-        return self._client
+        """Shared S3 client (created on first use)."""
+        return _get_s3_client()
     
     def upload_label(
         self,
@@ -258,11 +386,12 @@ class S3Service:
         logger.info(f"[S3] Uploading label to s3://{self.bucket_name}/{s3_key}")
         
         try:
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=label_data,
-                ContentType='application/pdf'
+            self.client.upload_fileobj(
+                io.BytesIO(label_data),
+                self.bucket_name,
+                s3_key,
+                ExtraArgs={'ContentType': 'application/pdf'},
+                Config=_s3_transfer_config,
             )
             
             logger.info(f"[S3] ✅ Label uploaded successfully: {s3_key}")
@@ -287,6 +416,24 @@ class S3Service:
         except Exception as e:
             logger.error(f"[S3] ❌ Download failed: {e}")
             return None
+    
+    async def upload_label_async(
+        self,
+        label_data: bytes,
+        return_id: int,
+        order_id: str,
+        tracking_number: str,
+    ) -> Optional[dict]:
+        """Awaitable upload_label - runs on the shared S3 upload pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _s3_executor, self.upload_label, label_data, return_id, order_id, tracking_number
+        )
+    
+    async def get_label_async(self, s3_key: str) -> Optional[bytes]:
+        """Awaitable get_label - runs on the shared S3 upload pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_s3_executor, self.get_label, s3_key)
 
 
 class LabelService:
@@ -294,7 +441,7 @@ class LabelService:
     
     def __init__(self, db: Session):
         self.db = db
-        self.dhl_service = DHLService()
+        self.dhl_service = dhl_service
         self.s3_service = S3Service()
         
     def _parse_address(self, address_line: str) -> tuple:
@@ -302,149 +449,333 @@ class LabelService:
         if not address_line:
             return ("", "1")  # DHL requires house number - use fallback
             
-        # Split from right, max 1 split - house number is usually at the end
-        parts = address_line.rsplit(' ', 1)
-        if len(parts) == 2 and any(c.isdigit() for c in parts[1]):
-            return (parts[0], parts[1])
+        # House number is usually the last token and contains a digit
+        match = ADDRESS_HOUSE_NUMBER_RE.match(address_line)
+        if match:
+            return (match.group(1), match.group(2))
         else:
             # No house number detected - use whole line as street and fallback house number
             return (address_line, "1")
         
-    async def generate_label(self, amazon_return: AmazonReturn) -> Optional[AmazonReturnGeneratedLabel]:
-        """Generate a DHL return label for a single return."""
+    def _validate_address(self, amazon_return: AmazonReturn):
+        """Raise LabelGenerationError if the return's address can't produce a DHL label."""
         if not amazon_return.address:
-            logger.error(f"Return {amazon_return.return_request_id} has no address")
-            amazon_return.mark_error("No address available for label generation")
-            return None
+            raise LabelGenerationError("No address available for label generation")
             
         address = amazon_return.address
         
         # Validate required address fields
         if not address.name or not address.city or not address.postal_code:
-            logger.error(f"Return {amazon_return.return_request_id} has incomplete address")
-            amazon_return.mark_error("Incomplete address: missing name, city, or postal code")
+            raise LabelGenerationError("Incomplete address: missing name, city, or postal code")
+    
+    def _reuse_existing_label(self, amazon_return: AmazonReturn) -> Optional[AmazonReturnGeneratedLabel]:
+        """
+        Advance a return whose label was already created and stored in S3.
+        
+        Avoids creating a second DHL shipment (e.g. after a crash between
+        label creation and the status update). Returns None if there is
+        nothing to reuse.
+        """
+        label = amazon_return.generated_label
+        if not label or label.state != LabelState.CREATED or not label.s3_key:
             return None
         
-        try:
-            # Parse street address
-            address_line = address.address_field_two or address.address_field_one or address.address_field_three or ""
-            street, house = self._parse_address(address_line)
-            postal_code = address.postal_code
-            
-            # Build customs items from return items
-            customs_items = []
-            if amazon_return.items:
-                for item in amazon_return.items:
-                    price = item.calculated_price or item.unit_price or 0
-                    customs_items.append({
-                        "itemDescription": (item.product_title or "Return Item")[:50],
-                        "packagedQuantity": item.return_quantity or 1,
-                        "itemValue": {"currency": str(amazon_return.currency_code or "EUR"), "value": float(price) if price > 0 else 0.0},
-                        "itemWeight": {"uom": "kg", "value": 1}
-                    })
-            
-            if not customs_items:
-                customs_items = None  # Let DHLService use default
-            
-            # Use RMA number or order_id as reference
-            rma_reference = amazon_return.internal_rma or amazon_return.rma_id or amazon_return.order_id
-            
-            logger.info(f"[Label] Generating DHL label for {amazon_return.return_request_id}")
-            logger.info(f"[Label] Customer: {address.name}, {address.city} {postal_code}")
-            logger.info(f"[Label] RMA Reference: {rma_reference}")
-            
-            # Step 1: Create DHL shipment and get label
-            result = await self.dhl_service.create_return_shipment(
-                shipper_name=address.name,
-                shipper_street=street,
-                shipper_house=house,
-                shipper_city=address.city,
-                shipper_postal_code=postal_code,
-                shipper_country=address.country_code or "DE",
-                rma_number=rma_reference,
-                customs_items=customs_items,
-            )
-            
-            if not result or not result.get("label_data"):
-                logger.error(f"DHL shipment creation failed for {amazon_return.return_request_id}")
-                amazon_return.mark_error("DHL shipment creation failed - no label returned")
-                return None
-                
-            tracking_number = result["tracking_number"]
-            label_data = result["label_data"]
-            
-            logger.info(f"[Label] ✅ DHL tracking: {tracking_number}")
-            
-            # Step 2: Upload label PDF to S3
-            s3_result = self.s3_service.upload_label(
-                label_data=label_data,
-                return_id=amazon_return.return_request_id,
-                order_id=amazon_return.order_id,
-                tracking_number=tracking_number,
-            )
+        amazon_return.internal_status = InternalStatus.LABEL_GENERATED
+        amazon_return.last_error = None
+        logger.info(f"[Label] Reusing existing label for {amazon_return.return_request_id}: {label.tracking_number}")
+        return label
+    
+    async def _create_and_upload(self, amazon_return: AmazonReturn) -> Tuple[str, str]:
+        """
+        Network half of label generation: create the DHL shipment and upload the PDF to S3.
+        
+        Expects a return that passed _validate_address. Only reads the
+        (pre-loaded) return; all DB state changes happen in _store_label.
+        
+        Returns:
+            Tuple of (tracking_number, s3_key)
             
-            if not s3_result:
-                logger.error(f"S3 upload failed for {amazon_return.return_request_id}")
-                amazon_return.mark_error("S3 label upload failed")
-                return None
-                
-            # Step 3: Check for existing label record or create new
-            existing = self.db.query(AmazonReturnGeneratedLabel).filter(
-                AmazonReturnGeneratedLabel.return_id == amazon_return.id
-            ).first()
+        Raises:
+            LabelGenerationError: If the return can't be labelled or an API call fails
+        """
+        address = amazon_return.address
+        
+        # Parse street address
+        address_line = address.address_field_two or address.address_field_one or address.address_field_three or ""
+        street, house = self._parse_address(address_line)
+        postal_code = address.postal_code
+        
+        # Build customs items from return items
+        customs_items = []
+        if amazon_return.items:
+            for item in amazon_return.items:
+                price = item.calculated_price or item.unit_price or 0
+                customs_items.append({
+                    "itemDescription": (item.product_title or "Return Item")[:50],
+                    "packagedQuantity": item.return_quantity or 1,
+                    "itemValue": {"currency": str(amazon_return.currency_code or "EUR"), "value": float(price) if price > 0 else 0.0},
+                    "itemWeight": {"uom": "kg", "value": 1}
+                })
+        
+        if not customs_items:
+            customs_items = None  # Let DHLService use default
+        
+        # Use RMA number or order_id as reference
+        rma_reference = amazon_return.internal_rma or amazon_return.rma_id or amazon_return.order_id
+        
+        logger.info(f"[Label] Generating DHL label for {amazon_return.return_request_id}")
+        logger.info(f"[Label] Customer: {address.name}, {address.city} {postal_code}")
+        logger.info(f"[Label] RMA Reference: {rma_reference}")
+        
+        # Step 1: Create DHL shipment and get label
+        result = await self.dhl_service.create_return_shipment(
+            shipper_name=address.name,
+            shipper_street=street,
+            shipper_house=house,
+            shipper_city=address.city,
+            shipper_postal_code=postal_code,
+            shipper_country=address.country_code or "DE",
+            rma_number=rma_reference,
+            customs_items=customs_items,
+        )
+        
+        if not result or not result.get("label_data"):
+            raise LabelGenerationError("DHL shipment creation failed - no label returned")
             
-            if existing:
-                label = existing
-            else:
-                label = AmazonReturnGeneratedLabel(return_id=amazon_return.id)
-                self.db.add(label)
-                
-            # Step 4: Update label record
-            label.tracking_number = tracking_number
-            label.s3_key = s3_result["s3_key"]
-            label.state = LabelState.CREATED
+        tracking_number = result["tracking_number"]
+        label_data = result["label_data"]
+        
+        logger.info(f"[Label] ✅ DHL tracking: {tracking_number}")
+        
+        # Step 2: Upload label PDF to S3
+        s3_result = await self.s3_service.upload_label_async(
+            label_data=label_data,
+            return_id=amazon_return.return_request_id,
+            order_id=amazon_return.order_id,
+            tracking_number=tracking_number,
+        )
+        
+        if not s3_result:
+            raise LabelGenerationError("S3 label upload failed")
+        
+        return tracking_number, s3_result["s3_key"]
+    
+    def _store_label(
+        self,
+        amazon_return: AmazonReturn,
+        tracking_number: str,
+        s3_key: str,
+        update_status: bool = True,
+    ) -> AmazonReturnGeneratedLabel:
+        """
+        DB half of label generation: record the label and advance the return status.
+        
+        Batch callers pass update_status=False and advance statuses in bulk
+        via _mark_label_generated instead.
+        """
+        # Reuse existing label record (pre-loaded in batch runs) or create new
+        label = amazon_return.generated_label
+        
+        if not label:
+            label = AmazonReturnGeneratedLabel(return_id=amazon_return.id)
+            amazon_return.generated_label = label
             
-            # Step 5: Update return status
+        label.tracking_number = tracking_number
+        label.s3_key = s3_key
+        label.state = LabelState.CREATED
+        
+        if update_status:
             amazon_return.internal_status = InternalStatus.LABEL_GENERATED
             amazon_return.last_error = None
-            
-            self.db.flush()
-            
-            logger.info(f"[Label] ✅ Label generated and uploaded for {amazon_return.return_request_id}: {tracking_number}")
-            return label
-            
+        
+        logger.info(f"[Label] ✅ Label generated and uploaded for {amazon_return.return_request_id}: {tracking_number}")
+        return label
+    
+    def _mark_label_generated(self, return_ids: List[int]):
+        """
+        Advance returns to LABEL_GENERATED with one UPDATE ... WHERE id IN (...).
+        
+        Replaces one UPDATE per return at flush time; in-session objects are
+        synchronized in memory.
+        """
+        if not return_ids:
+            return
+        self.db.query(AmazonReturn).filter(AmazonReturn.id.in_(return_ids)).update({
+            AmazonReturn.internal_status: InternalStatus.LABEL_GENERATED,
+            AmazonReturn.last_error: None,
+        }, synchronize_session="evaluate")
+    
+    def _record_failure(self, amazon_return: AmazonReturn, error: Exception):
+        """Mark a return as failed after label generation raised."""
+        if isinstance(error, LabelGenerationError):
+            error_msg = str(error)
+        else:
+            error_msg = f"Label generation failed: {str(error)}"
+        logger.error(f"[Label] ❌ Failed to generate label for {amazon_return.return_request_id}: {error_msg}")
+        amazon_return.mark_error(error_msg)
+        
+    async def generate_label(self, amazon_return: AmazonReturn) -> Optional[AmazonReturnGeneratedLabel]:
+        """Generate a DHL return label for a single return."""
+        existing = self._reuse_existing_label(amazon_return)
+        if existing:
+            return existing
+        
+        try:
+            self._validate_address(amazon_return)
+            tracking_number, s3_key = await self._create_and_upload(amazon_return)
         except Exception as e:
-            logger.error(f"[Label] ❌ Failed to generate label for {amazon_return.return_request_id}: {e}")
-            amazon_return.mark_error(f"Label generation failed: {str(e)}")
+            self._record_failure(amazon_return, e)
             return None
+        return self._store_label(amazon_return, tracking_number, s3_key)
+            
+    def _reuse_existing_labels(self) -> int:
+        """
+        Advance ELIGIBLE returns that already have a stored label, in one UPDATE.
+        
+        Bulk counterpart of _reuse_existing_label; runs before
+        _fail_unlabelable_returns so a reusable label wins over an
+        incomplete address, as it does in generate_label.
+        
+        Returns:
+            Number of returns advanced to LABEL_GENERATED
+        """
+        reused = (
+            self.db.query(AmazonReturn)
+            .filter(
+                AmazonReturn.internal_status == InternalStatus.ELIGIBLE,
+                AmazonReturn.generated_label.has(and_(
+                    AmazonReturnGeneratedLabel.state == LabelState.CREATED,
+                    AmazonReturnGeneratedLabel.s3_key.isnot(None),
+                    AmazonReturnGeneratedLabel.s3_key != "",
+                )),
+            )
+            .update({
+                AmazonReturn.internal_status: InternalStatus.LABEL_GENERATED,
+                AmazonReturn.last_error: None,
+            }, synchronize_session="fetch")
+        )
+        if reused:
+            logger.info(f"Reused {reused} previously created labels")
+        return reused
+            
+    def _fail_unlabelable_returns(self) -> int:
+        """
+        Mark ELIGIBLE returns without a usable address as PROCESSING_ERROR.
+        
+        Same outcome as _validate_address, but as two UPDATE statements
+        instead of loading and checking every row in Python.
+        
+        Returns:
+            Number of returns marked as failed
+        """
+        no_address = (
+            self.db.query(AmazonReturn)
+            .filter(
+                AmazonReturn.internal_status == InternalStatus.ELIGIBLE,
+                ~AmazonReturn.address.has(),
+            )
+            .update({
+                AmazonReturn.internal_status: InternalStatus.PROCESSING_ERROR,
+                AmazonReturn.last_error: "No address available for label generation",
+            }, synchronize_session=False)
+        )
+        incomplete_address = (
+            self.db.query(AmazonReturn)
+            .filter(
+                AmazonReturn.internal_status == InternalStatus.ELIGIBLE,
+                AmazonReturn.address.has(not_(and_(*_complete_address_clauses()))),
+            )
+            .update({
+                AmazonReturn.internal_status: InternalStatus.PROCESSING_ERROR,
+                AmazonReturn.last_error: "Incomplete address: missing name, city, or postal code",
+            }, synchronize_session=False)
+        )
+        
+        if no_address or incomplete_address:
+            logger.warning(
+                f"[Label] Marked {no_address} returns without address and "
+                f"{incomplete_address} with incomplete address as errors"
+            )
+        return no_address + incomplete_address
             
     async def generate_labels_for_eligible(self) -> int:
-        """Generate labels for all eligible returns."""
-        # Get returns that need labels
+        """
+        Generate labels for all eligible returns.
+        
+        Producer/consumer pipeline: up to MAX_CONCURRENT_LABELS network workers run
+        DHL + S3 calls and hand their results to a single DB writer, which owns the
+        (non thread-safe) session and flushes every LABEL_FLUSH_BATCH_SIZE labels.
+        """
+        # Already-labelled returns are advanced first, then returns whose
+        # address can never produce a label are failed - both in bulk, in SQL
+        self._reuse_existing_labels()
+        self._fail_unlabelable_returns()
+        
+        # Get returns that need labels (address completeness is filtered in SQL)
+        # Eager-load address, items and existing labels so generate_label doesn't query per return
         returns = (
             self.db.query(AmazonReturn)
-            .filter(AmazonReturn.internal_status.in_([
-                InternalStatus.ELIGIBLE
-            ]))
+            .join(AmazonReturn.address)
+            .options(
+                contains_eager(AmazonReturn.address),
+                selectinload(AmazonReturn.items),
+                selectinload(AmazonReturn.generated_label),
+            )
+            .filter(
+                AmazonReturn.internal_status == InternalStatus.ELIGIBLE,
+                *_complete_address_clauses(),
+            )
             .all()
         )
         
         logger.info(f"Generating labels for {len(returns)} returns")
         
-        generated_count = 0
-        
+        work_queue: asyncio.Queue = asyncio.Queue()
         for amazon_return in returns:
-            try:
-                label = await self.generate_label(amazon_return)
-                if label:
-                    generated_count += 1
-            except Exception as e:
-                logger.error(f"Error generating label for {amazon_return.return_request_id}: {e}")
-                amazon_return.mark_error(f"Label generation error: {str(e)}")
-                continue
+            work_queue.put_nowait(amazon_return)
+            
+        results_queue: asyncio.Queue = asyncio.Queue()
+        
+        async def network_worker():
+            while not work_queue.empty():
+                amazon_return = work_queue.get_nowait()
+                try:
+                    outcome = await self._create_and_upload(amazon_return)
+                except Exception as e:
+                    outcome = e
+                await results_queue.put((amazon_return, outcome))
+        
+        async def db_writer() -> int:
+            generated = 0
+            labelled_ids: List[int] = []
+            while True:
+                item = await results_queue.get()
+                if item is None:
+                    self._mark_label_generated(labelled_ids)
+                    return generated
+                amazon_return, outcome = item
+                if isinstance(outcome, Exception):
+                    self._record_failure(amazon_return, outcome)
+                    continue
+                self._store_label(amazon_return, *outcome, update_status=False)
+                labelled_ids.append(amazon_return.id)
+                generated += 1
+                if generated % LABEL_FLUSH_BATCH_SIZE == 0:
+                    self._mark_label_generated(labelled_ids)
+                    labelled_ids = []
+                    self.db.flush()
+        
+        writer = asyncio.create_task(db_writer())
+        await asyncio.gather(*(network_worker() for _ in range(min(MAX_CONCURRENT_LABELS, work_queue.qsize()))))
+        await results_queue.put(None)
+        generated_count = await writer
                 
-        # Commit all changes
+        # Commit all changes in one transaction
         self.db.commit()
         
         logger.info(f"Generated {generated_count} labels")
         return generated_count
+
+
+# Global singleton (shared across cycles so the DHL OAuth token is reused)
+dhl_service = DHLService()
@@ -2,16 +2,16 @@
 Retry Handler - Centralized retry logic with session reset and circuit breaker.
 
 Features:
-- Configurable retry attempts with exponential backoff
+- Configurable retry attempts with capped exponential backoff and full jitter
 - Circuit breaker pattern for resilience
-- Thread-safe with asyncio.Lock
+- Lock-free circuit breaker (state changes happen within a single event-loop tick)
 - Structured error classification
 - Session reset on recoverable errors
 
 When any Amazon API call fails with 4xx/5xx:
 1. Check circuit breaker state
 2. Perform hard session reset
-3. Wait with exponential backoff
+3. Wait with jittered exponential backoff
 4. Re-initialize session
 5. Retry the API call up to MAX_ATTEMPTS times
 6. If still fails, record error and exit flow for that return
@@ -19,12 +19,15 @@ When any Amazon API call fails with 4xx/5xx:
 
 import asyncio
 import logging
+import random
+import re
 import time
 from datetime import datetime
 from enum import Enum
-from typing import Any, Callable, Optional, Tuple, TYPE_CHECKING, Set
+from typing import Any, Callable, FrozenSet, Optional, Tuple, TYPE_CHECKING, Union
 
 from config import settings
+from services.amazon_client import HTTPError, SessionExpiredError
 
 if TYPE_CHECKING:
     from services.session_manager import SessionManager
@@ -35,7 +38,32 @@ logger = logging.getLogger(__name__)
 
 
 # Recoverable HTTP status codes that warrant retry
-RECOVERABLE_STATUS_CODES: Set[int] = {401, 403, 429, 500, 502, 503, 504}
+RECOVERABLE_STATUS_CODES: FrozenSet[int] = frozenset({401, 403, 429, 500, 502, 503, 504})
+
+# Exception types that are always recoverable (single isinstance check)
+_RECOVERABLE_TYPES = (SessionExpiredError,)
+
+# Network error patterns for the message-based fallback classification
+_NET_ERR_RE = re.compile(r'connection|timeout|reset|refused|unreachable', re.IGNORECASE)
+
+# Retry/circuit settings snapshotted at import (settings are never reloaded at runtime)
+_MAX_ATTEMPTS = settings.RETRY_MAX_ATTEMPTS
+_BASE_WAIT = settings.RETRY_WAIT_SECONDS
+_MULT = settings.RETRY_BACKOFF_MULTIPLIER
+_WAIT_MAX = settings.RETRY_WAIT_MAX
+_SESSION_RESET_WAIT = settings.SESSION_RESET_WAIT_SECONDS
+_SESSION_RESET_MAX_ATTEMPTS = settings.SESSION_RESET_MAX_ATTEMPTS
+_CB_THRESHOLD = settings.CIRCUIT_BREAKER_THRESHOLD
+_CB_RESET_TIMEOUT = settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+
+
+def _build_backoff_table() -> Tuple[float, ...]:
+    """Capped exponential delay per retry attempt (index = attempt - 1)."""
+    return tuple(min(_WAIT_MAX, _BASE_WAIT * _MULT ** i) for i in range(_MAX_ATTEMPTS))
+
+
+# Pre-jitter backoff delays, fixed for a given settings snapshot
+_BACKOFF_TABLE = _build_backoff_table()
 
 
 class CircuitState(str, Enum):
@@ -54,9 +82,15 @@ class CircuitBreaker:
     - OPEN: Too many failures, block requests to prevent resource exhaustion
     - HALF-OPEN: Test with single request after reset timeout
     
+    Scope: state is per-process. The worker runs a single process with one
+    event loop, so the shared instance on RetryWithSessionReset sees all
+    Amazon API traffic. Running several worker processes against the same
+    account would need a shared backend for this state.
+    
     Usage:
         breaker = CircuitBreaker()
-        if breaker.allow_request():
+        allowed, is_probe = breaker.allow_request()
+        if allowed:
             try:
                 result = await api_call()
                 breaker.record_success()
@@ -69,71 +103,97 @@ class CircuitBreaker:
         failure_threshold: int = None,
         reset_timeout: int = None
     ):
-        self.failure_threshold = failure_threshold or settings.CIRCUIT_BREAKER_THRESHOLD
-        self.reset_timeout = reset_timeout or settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+        self.failure_threshold = failure_threshold or _CB_THRESHOLD
+        self.reset_timeout = reset_timeout or _CB_RESET_TIMEOUT
         
         self._state = CircuitState.CLOSED
         self._failure_count = 0
+        # Monotonic clock for state-machine timing (immune to wall-clock jumps)
         self._last_failure_time: Optional[float] = None
-        self._lock = asyncio.Lock()
+        # Wall-clock ISO string, formatted once per failure for the status report
+        self._last_failure_iso: Optional[str] = None
+        # Number of probe requests admitted while HALF-OPEN (at most 1)
+        self._half_open_in_flight = 0
         
     @property
     def state(self) -> CircuitState:
         """Get current circuit state."""
         return self._state
     
-    async def allow_request(self) -> bool:
+    def allow_request(self) -> Tuple[bool, bool]:
         """
         Check if request should be allowed.
         
+        Synchronous on purpose: with no await between reading and writing
+        state, each check is atomic with respect to other coroutines.
+        
         Returns:
-            True if request is allowed, False if blocked
+            Tuple of (allowed, is_probe) - is_probe is True only for the one
+            HALF-OPEN request that owns the probe slot; only that caller may
+            release_probe()
         """
-        async with self._lock:
-            if self._state == CircuitState.CLOSED:
-                return True
-                
-            if self._state == CircuitState.OPEN:
-                # Check if reset timeout has passed
-                if self._last_failure_time:
-                    elapsed = time.time() - self._last_failure_time
-                    if elapsed >= self.reset_timeout:
-                        logger.info(f"[CircuitBreaker] Transitioning to HALF-OPEN after {elapsed:.0f}s")
-                        self._state = CircuitState.HALF_OPEN
-                        return True
-                        
-                logger.warning("[CircuitBreaker] Circuit OPEN - request blocked")
-                return False
-                
-            # HALF-OPEN: Allow one test request
-            return True
+        # Fast path: steady-state CLOSED needs no further checks
+        if self._state is CircuitState.CLOSED:
+            return True, False
+            
+        if self._state is CircuitState.OPEN:
+            # Check if reset timeout has passed
+            if self._last_failure_time is not None:
+                elapsed = time.monotonic() - self._last_failure_time
+                if elapsed >= self.reset_timeout:
+                    logger.info("[CircuitBreaker] Transitioning to HALF-OPEN after %.0fs", elapsed)
+                    self._state = CircuitState.HALF_OPEN
+                    self._half_open_in_flight = 1
+                    return True, True
+                    
+            logger.warning("[CircuitBreaker] Circuit OPEN - request blocked")
+            return False, False
+            
+        # HALF-OPEN: Allow exactly one probe, fast-fail everyone else
+        if self._half_open_in_flight >= 1:
+            return False, False
+        self._half_open_in_flight = 1
+        return True, True
+    
+    def release_probe(self):
+        """Release the HALF-OPEN probe slot without changing state.
+        
+        Used when the probe ended with an error that says nothing about
+        service health (non-recoverable) or was cancelled, so the next
+        caller may probe. Only the caller allow_request() marked as the
+        probe may call this.
+        """
+        self._half_open_in_flight = 0
     
-    async def record_success(self):
+    def record_success(self):
         """Record successful request - reset failure count."""
-        async with self._lock:
-            if self._state == CircuitState.HALF_OPEN:
-                logger.info("[CircuitBreaker] Success in HALF-OPEN - closing circuit")
-            
-            self._failure_count = 0
-            self._state = CircuitState.CLOSED
-            self._last_failure_time = None
+        if self._state is CircuitState.HALF_OPEN:
+            logger.info("[CircuitBreaker] Success in HALF-OPEN - closing circuit")
+        
+        self._failure_count = 0
+        self._state = CircuitState.CLOSED
+        self._last_failure_time = None
+        self._last_failure_iso = None
+        self._half_open_in_flight = 0
     
-    async def record_failure(self):
+    def record_failure(self):
         """Record failed request - potentially open circuit."""
-        async with self._lock:
-            self._failure_count += 1
-            self._last_failure_time = time.time()
-            
-            if self._state == CircuitState.HALF_OPEN:
-                logger.warning("[CircuitBreaker] Failure in HALF-OPEN - reopening circuit")
-                self._state = CircuitState.OPEN
-                return
-            
-            if self._failure_count >= self.failure_threshold:
-                logger.warning(
-                    f"[CircuitBreaker] Threshold reached ({self._failure_count}/{self.failure_threshold}) - opening circuit"
-                )
-                self._state = CircuitState.OPEN
+        self._failure_count += 1
+        self._last_failure_time = time.monotonic()
+        self._last_failure_iso = datetime.now().isoformat()
+        
+        if self._state is CircuitState.HALF_OPEN:
+            logger.warning("[CircuitBreaker] Failure in HALF-OPEN - reopening circuit")
+            self._state = CircuitState.OPEN
+            self._half_open_in_flight = 0
+            return
+        
+        if self._failure_count >= self.failure_threshold:
+            logger.warning(
+                "[CircuitBreaker] Threshold reached (%d/%d) - opening circuit",
+                self._failure_count, self.failure_threshold
+            )
+            self._state = CircuitState.OPEN
     
     def get_status(self) -> dict:
         """Get circuit breaker status for monitoring."""
@@ -142,10 +202,43 @@ class CircuitBreaker:
             "failure_count": self._failure_count,
             "failure_threshold": self.failure_threshold,
             "reset_timeout": self.reset_timeout,
-            "last_failure": datetime.fromtimestamp(self._last_failure_time).isoformat() if self._last_failure_time else None
+            "half_open_in_flight": self._half_open_in_flight,
+            "last_failure": self._last_failure_iso
         }
 
 
+class NullCircuitBreaker:
+    """
+    No-op stand-in for CircuitBreaker when CIRCUIT_BREAKER_ENABLED is off.
+    
+    Same interface, always CLOSED, so execute_with_retry stays branch-free.
+    """
+    
+    failure_threshold = None
+    reset_timeout = None
+    
+    @property
+    def state(self) -> CircuitState:
+        """Always CLOSED."""
+        return CircuitState.CLOSED
+    
+    def allow_request(self) -> Tuple[bool, bool]:
+        return True, False
+    
+    def release_probe(self):
+        pass
+    
+    def record_success(self):
+        pass
+    
+    def record_failure(self):
+        pass
+    
+    def get_status(self) -> dict:
+        """Get circuit breaker status for monitoring."""
+        return {"state": CircuitState.CLOSED.value, "enabled": False}
+
+
 class SessionResetRequiredError(Exception):
     """Raised when a session reset and retry is needed."""
     def __init__(self, message: str, original_error: Exception = None):
@@ -159,9 +252,9 @@ class RetryWithSessionReset:
     
     Features:
     - Configurable retry attempts from settings
-    - Exponential backoff between retries
+    - Exponential backoff between retries with full jitter (capped at RETRY_WAIT_MAX)
     - Circuit breaker integration
-    - Thread-safe with asyncio.Lock
+    - Lock-free: runs on a single event loop, state checks never span an await
     - Structured error classification
     
     Usage:
@@ -173,8 +266,12 @@ class RetryWithSessionReset:
         )
     """
     
-    # Global circuit breaker shared across all instances
-    _circuit_breaker = CircuitBreaker()
+    # Global circuit breaker shared across all instances (no-op when disabled)
+    _circuit_breaker = CircuitBreaker() if settings.CIRCUIT_BREAKER_ENABLED else NullCircuitBreaker()
+    
+    # In-flight session reset shared by all instances (singleflight); the
+    # check-and-set happens without an await, so no lock is needed
+    _reset_future: Optional[asyncio.Future] = None
     
     def __init__(
         self, 
@@ -183,10 +280,13 @@ class RetryWithSessionReset:
     ):
         self.session_manager = session_manager
         self.amazon_client = amazon_client
-        self._retry_lock = asyncio.Lock()
+        # Bind the shared breaker on the instance to skip the class lookup per call
+        self._cb = type(self)._circuit_breaker
+        # Per-instance RNG so concurrent retry flows don't share PRNG state
+        self._random = random.SystemRandom()
         
     @classmethod
-    def get_circuit_breaker(cls) -> CircuitBreaker:
+    def get_circuit_breaker(cls) -> Union[CircuitBreaker, NullCircuitBreaker]:
         """Get the shared circuit breaker instance."""
         return cls._circuit_breaker
         
@@ -212,15 +312,17 @@ class RetryWithSessionReset:
             - On success: (True, result_from_api_call)
             - On failure: (False, error_message)
         """
-        # Check circuit breaker first
-        if not await self._circuit_breaker.allow_request():
+        cb = self._cb
+        
+        # Check circuit breaker first; only the HALF-OPEN probe owns the slot
+        allowed, is_probe = cb.allow_request()
+        if not allowed:
             error_msg = f"{error_context}: Circuit breaker OPEN - request blocked"
-            logger.warning(f"[Retry] {error_msg}")
+            logger.warning("[Retry] %s", error_msg)
             return False, error_msg
         
-        max_attempts = settings.RETRY_MAX_ATTEMPTS
-        base_wait = settings.RETRY_WAIT_SECONDS
-        backoff_multiplier = settings.RETRY_BACKOFF_MULTIPLIER
+        max_attempts = _MAX_ATTEMPTS
+        backoff_table = _BACKOFF_TABLE
         
         last_error = None
         
@@ -228,21 +330,24 @@ class RetryWithSessionReset:
             try:
                 if attempt == 0:
                     # First attempt - no wait
-                    logger.debug(f"[Retry] Initial attempt for: {error_context}")
+                    logger.debug("[Retry] Initial attempt for: %s", error_context)
                 else:
-                    # Retry attempt - calculate wait with exponential backoff
-                    wait_time = base_wait * (backoff_multiplier ** (attempt - 1))
-                    logger.info(f"[Retry] Attempt {attempt}/{max_attempts} - waiting {wait_time:.0f}s...")
+                    # Retry attempt - full jitter over the capped exponential backoff,
+                    # so parallel workers don't retry in lockstep
+                    exp_delay = backoff_table[attempt - 1]
+                    wait_time = self._random.uniform(0, exp_delay)
+                    logger.info("[Retry] Attempt %d/%d - waiting %.0fs...", attempt, max_attempts, wait_time)
                     await asyncio.sleep(wait_time)
                 
                 # Execute the API call
                 result = await api_call(*args, **kwargs)
                 
                 # Success - record and return
-                await self._circuit_breaker.record_success()
+                cb.record_success()
+                is_probe = False
                 
                 if attempt > 0:
-                    logger.info(f"[Retry] ✅ Success on attempt {attempt}")
+                    logger.info("[Retry] ✅ Success on attempt %d", attempt)
                     
                 return True, result
                 
@@ -251,25 +356,42 @@ class RetryWithSessionReset:
                 
                 # Check if error is recoverable
                 if not self._is_recoverable_error(e):
+                    if is_probe:
+                        cb.release_probe()
+                        is_probe = False
                     error_msg = f"{error_context}: {str(e)}"
-                    logger.error(f"[Retry] Non-recoverable error: {error_msg}")
+                    logger.error("[Retry] Non-recoverable error: %s", error_msg)
                     if amazon_return:
                         self._record_error(amazon_return, error_msg)
                     return False, error_msg
                 
-                logger.warning(f"[Retry] Attempt {attempt} failed: {e}")
+                logger.warning("[Retry] Attempt %d failed: %s", attempt, e)
                 
-                # Record failure for circuit breaker
-                await self._circuit_breaker.record_failure()
+                # Record failure for circuit breaker (settles our probe, if any)
+                cb.record_failure()
+                is_probe = False
                 
                 # If we have more attempts, perform session reset
-                if attempt < max_attempts:
-                    async with self._retry_lock:
-                        await self._perform_session_reset()
+                # (SessionManager serializes concurrent resets itself)
+                if attempt < max_attempts and not await self._perform_session_reset():
+                    # Reset has its own retry budget; once that is spent,
+                    # further API attempts would only hit a dead session
+                    last_error = SessionResetRequiredError(
+                        f"Session reset failed after {_SESSION_RESET_MAX_ATTEMPTS} attempts",
+                        original_error=e
+                    )
+                    break
+            
+            except BaseException:
+                # Cancelled (shutdown, wait_for timeout) - a HALF-OPEN probe
+                # must hand its slot back or the breaker blocks forever
+                if is_probe:
+                    cb.release_probe()
+                raise
         
         # All attempts exhausted
-        error_msg = f"{error_context}: Failed after {max_attempts} retry attempts - {str(last_error)}"
-        logger.error(f"[Retry] ❌ All retries exhausted: {error_msg}")
+        error_msg = f"{error_context}: Failed after {attempt} retry attempts - {str(last_error)}"
+        logger.error("[Retry] ❌ All retries exhausted: %s", error_msg)
         
         if amazon_return:
             self._record_error(amazon_return, error_msg)
@@ -282,31 +404,74 @@ class RetryWithSessionReset:
         
         return False, error_msg
     
-    async def _perform_session_reset(self):
-        """Perform session reset with proper wait time."""
-        logger.info("[Retry] Performing session reset...")
+    async def _perform_session_reset(self) -> bool:
+        """
+        Reset the session, retrying transient login failures.
         
-        # Step 1: Hard reset session
-        logger.info("[Retry] Step 1: Hard reset session...")
-        await self.session_manager.hard_reset()
+        Runs up to SESSION_RESET_MAX_ATTEMPTS resets with jittered backoff
+        in between, so a rate-limited login doesn't burn the outer
+        API-call retry budget.
         
-        # Step 2: Wait for session to settle
-        wait_time = settings.SESSION_RESET_WAIT_SECONDS
-        logger.info(f"[Retry] Step 2: Waiting {wait_time}s for session reset cooldown...")
-        await asyncio.sleep(wait_time)
+        Returns:
+            True once the Amazon client has a fresh session, False if the
+            reset budget is exhausted
+        """
+        for reset_attempt in range(1, _SESSION_RESET_MAX_ATTEMPTS + 1):
+            try:
+                new_session = await self._reset_session_once()
+            except Exception as e:
+                logger.warning("[Retry] Session reset attempt %d failed: %s", reset_attempt, e)
+                new_session = None
+            
+            if new_session:
+                # Step 4: Update amazon client with new session
+                logger.info("[Retry] Step 4: Updating Amazon client with fresh session...")
+                self.amazon_client.update_session(new_session)
+                logger.info("[Retry] Session reset complete")
+                return True
+            
+            if reset_attempt < _SESSION_RESET_MAX_ATTEMPTS:
+                exp_delay = min(_WAIT_MAX, _SESSION_RESET_WAIT * (2 ** (reset_attempt - 1)))
+                wait_time = self._random.uniform(0, exp_delay)
+                logger.info(
+                    "[Retry] Session reset %d/%d failed - waiting %.0fs...",
+                    reset_attempt, _SESSION_RESET_MAX_ATTEMPTS, wait_time
+                )
+                await asyncio.sleep(wait_time)
         
-        # Step 3: Re-initialize session
-        logger.info("[Retry] Step 3: Re-initializing session with fresh login...")
-        new_session = await self.session_manager.init_session_for_cycle()
+        logger.error("[Retry] ❌ Session reset failed after %d attempts", _SESSION_RESET_MAX_ATTEMPTS)
+        return False
+    
+    async def _reset_session_once(self) -> Optional[Any]:
+        """
+        Perform a single session reset with proper wait time.
         
-        if not new_session:
-            raise Exception("Failed to re-initialize session after reset")
+        Concurrent callers coalesce onto one in-flight reset: the first
+        caller performs it, everyone else awaits its result.
         
-        # Step 4: Update amazon client with new session
-        logger.info("[Retry] Step 4: Updating Amazon client with fresh session...")
-        self.amazon_client.update_session(new_session)
+        Returns:
+            Fresh session, or None if re-initialization failed
+        """
+        cls = type(self)
+        pending = cls._reset_future
+        if pending is not None and not pending.done():
+            logger.info("[Retry] Session reset already in flight - waiting for it...")
+            new_session = await asyncio.shield(pending)
+        else:
+            logger.info("[Retry] Performing session reset...")
+            future = asyncio.get_running_loop().create_future()
+            cls._reset_future = future
+            new_session = None
+            try:
+                # Steps 1-3: Hard reset, cooldown, fresh login (coordinated by SessionManager)
+                logger.info("[Retry] Steps 1-3: Hard reset, cooldown and fresh login...")
+                new_session = await self.session_manager.reset_session(_SESSION_RESET_WAIT)
+            finally:
+                # Waiters get None on failure and raise on their own
+                future.set_result(new_session)
+                cls._reset_future = None
         
-        logger.info("[Retry] Session reset complete")
+        return new_session
     
     def _is_recoverable_error(self, error: Exception) -> bool:
         """
@@ -317,24 +482,17 @@ class RetryWithSessionReset:
         - HTTPError with status codes in RECOVERABLE_STATUS_CODES
         - Network/connection errors
         """
-        from services.amazon_client import HTTPError, SessionExpiredError
-        
         # SessionExpiredError is always recoverable
-        if isinstance(error, SessionExpiredError):
+        if isinstance(error, _RECOVERABLE_TYPES):
             return True
         
         # HTTPError with specific status codes
-        if isinstance(error, HTTPError):
-            if hasattr(error, 'status_code') and error.status_code in RECOVERABLE_STATUS_CODES:
-                return True
+        # (HTTPError.__init__ always sets status_code, defaulting to 0)
+        if isinstance(error, HTTPError) and error.status_code in RECOVERABLE_STATUS_CODES:
+            return True
         
         # Check for common network error patterns (fallback)
-        error_str = str(error).lower()
-        network_keywords = ['connection', 'timeout', 'reset', 'refused', 'unreachable']
-        if any(keyword in error_str for keyword in network_keywords):
-            return True
-            
-        return False
+        return _NET_ERR_RE.search(str(error)) is not None
     
     def _record_error(self, amazon_return: 'AmazonReturn', error_msg: str):
         """
@@ -344,7 +502,7 @@ class RetryWithSessionReset:
         - last_error: Error message
         """
         amazon_return.last_error = error_msg
-        logger.info(f"[Retry] Recorded error for {amazon_return.return_request_id}")
+        logger.info("[Retry] Recorded error for %s", amazon_return.return_request_id)
 
 
 def notify_user_of_failure(return_id: str, error: str):
@@ -20,13 +20,22 @@ Key features:
 - Async queue-based RMA wait
 """
 
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional, Callable
+from functools import lru_cache, partial
+from operator import itemgetter
+from typing import Dict, Any, List, Optional, Callable, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, insert, or_, update
+from sqlalchemy.orm import Session, load_only
 
-from models.amazon_return import AmazonReturn, InternalStatus, ReturnRequestState
+from db.postgres_session import SessionLocal
+from models.amazon_return import AmazonReturn, AmazonReturnLabel, InternalStatus, ReturnRequestState
+from models.order_details import (
+    OrderGeneralDetails, OrderProductDescription,
+    OrderProductSpec, OrderProductAttribute, OrderTrackingInfo
+)
 from services.session_manager import SessionManager, SessionExpiredError, session_manager
 from services.amazon_client import AmazonClient, HTTPError
 from services.fetch_service import FetchService
@@ -43,6 +52,60 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Pending-RMA returns processed (and committed) per Step 3 chunk
+PENDING_RMA_CHUNK_SIZE = 200
+
+# Core INSERTs for the order detail tables, built once; executed with a list
+# of row dicts they run as a single batched executemany (column defaults
+# such as created_at still apply)
+_GD_INSERT = insert(OrderGeneralDetails)
+_PD_INSERT = insert(OrderProductDescription)
+_PS_INSERT = insert(OrderProductSpec)
+_PA_INSERT = insert(OrderProductAttribute)
+_TI_INSERT = insert(OrderTrackingInfo)
+
+# Order detail columns paired with a getter for the matching JTL row keys
+# (the JTL SELECTs always return every key), so each row dict is built with
+# one itemgetter call instead of a chain of dict.get() lookups
+_GD_COLUMNS = (
+    "jtl_order_id", "purchase_date", "status_code", "order_status", "is_fba", "is_prime",
+    "buyer_name", "buyer_email", "internal_order_number", "sku", "product_name", "asin",
+    "quantity_purchased"
+)
+_GD_FIELDS = itemgetter(
+    "cOrderId", "dPurchaseDate", "nStatus", "cOrderStatus", "nFBA", "nPrime",
+    "cBuyerName", "cBuyerEmail", "Internal_Order_Number", "SKU", "Product_Name", "ASIN",
+    "nQuantityPurchased"
+)
+_PD_COLUMNS = (
+    "sku", "internal_id", "display_name", "description_html", "short_description",
+    "manufacturer", "ean", "mpn"
+)
+_PD_FIELDS = itemgetter(
+    "SKU", "Internal_ID", "Display_Name", "Description_HTML", "Short_Description",
+    "Manufacturer", "EAN", "MPN"
+)
+_PS_COLUMNS = ("sku", "spec_name", "spec_value")
+_PS_FIELDS = itemgetter("SKU", "Spec_Name", "Spec_Value")
+_PA_COLUMNS = ("sku", "attribute_name", "attribute_value")
+_PA_FIELDS = itemgetter("SKU", "Attribute_Name", "Attribute_Value")
+_TI_COLUMNS = ("tracking_number", "carrier_id", "shipped_date", "delivery_note_date", "internal_order_number")
+_TI_FIELDS = itemgetter("Tracking_Number", "Carrier", "Shipped_Date", "DeliveryNote_Date", "cAuftragsNr")
+
+
+@lru_cache(maxsize=16384)
+def _parse_datetime_str(value: str) -> Optional[datetime]:
+    """Parse a datetime string (ISO first, then '%Y-%m-%d %H:%M:%S'); cached per raw string."""
+    try:
+        # Try ISO format first (slice off a trailing 'Z' only when present)
+        return datetime.fromisoformat(value[:-1] + '+00:00' if value[-1:] == 'Z' else value)
+    except ValueError:
+        try:
+            # Try common format
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+
 
 class ReturnFlow:
     """
@@ -85,17 +148,124 @@ class ReturnFlow:
         if isinstance(value, datetime):
             return value
         if isinstance(value, str):
-            try:
-                # Try ISO format first
-                return datetime.fromisoformat(value.replace('Z', '+00:00'))
-            except ValueError:
-                try:
-                    # Try common format
-                    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    return None
+            return _parse_datetime_str(value)
         return None
 
+    def _store_rma_chunk(
+        self,
+        pending_rma_returns: List[AmazonReturn],
+        order_data_map: Dict[str, Dict[str, Any]],
+        log_rows: bool
+    ) -> Tuple[List[str], List[str], int]:
+        """
+        Apply JTL RMA results and insert order details for one Step 3 chunk.
+        
+        Does not commit; the caller commits or rolls back the whole chunk.
+        
+        Args:
+            pending_rma_returns: PENDING_RMA returns of this chunk (all with an order_id)
+            order_data_map: JTL order data keyed by order_id (filled in place)
+            log_rows: Emit per-return DEBUG lines
+            
+        Returns:
+            Tuple of (found order IDs, missing order IDs, order details stored)
+        """
+        found_ids = []
+        missing_ids = []
+        order_details_stored = 0
+        
+        # Only query JTL for orders the prefetch didn't cover
+        missing_order_ids = [
+            r.order_id for r in pending_rma_returns
+            if r.order_id and r.order_id not in order_data_map
+        ]
+        if missing_order_ids:
+            order_data_map.update(jtl_service.get_all_order_data_batch(missing_order_ids))
+        
+        # Order detail rows, bulk-inserted per table after each chunk
+        gd_rows, pd_rows, ps_rows, pa_rows, ti_rows = [], [], [], [], []
+        parse_datetime = self._parse_datetime
+        
+        for amazon_return in pending_rma_returns:
+            order_id = amazon_return.order_id
+            order_data = order_data_map.get(order_id, {})
+        
+            # Update RMA status
+            rma = order_data.get("internal_rma")
+            if rma:
+                amazon_return.internal_rma = rma
+                amazon_return.internal_status = InternalStatus.RMA_RECEIVED
+                found_ids.append(order_id)
+                if log_rows:
+                    logger.debug("  ✓ %s -> RMA: %s", order_id, rma)
+            else:
+                amazon_return.internal_status = InternalStatus.NO_RMA_FOUND
+                missing_ids.append(order_id)
+                if log_rows:
+                    logger.debug("  ✗ %s -> RMA not found", order_id)
+        
+            # Store all order details in database
+            return_id = amazon_return.id
+        
+            # Store general details
+            for gd in order_data.get("general_details", []):
+                row = dict(zip(_GD_COLUMNS, _GD_FIELDS(gd)), return_id=return_id)
+                row["purchase_date"] = parse_datetime(row["purchase_date"])
+                row["is_fba"] = bool(row["is_fba"])
+                row["is_prime"] = bool(row["is_prime"])
+                gd_rows.append(row)
+        
+            # Store product descriptions
+            for pd in order_data.get("product_descriptions", []):
+                pd_rows.append(dict(zip(_PD_COLUMNS, _PD_FIELDS(pd)), return_id=return_id))
+        
+            # Store product specs
+            for ps in order_data.get("product_specs", []):
+                ps_rows.append(dict(zip(_PS_COLUMNS, _PS_FIELDS(ps)), return_id=return_id))
+        
+            # Store product attributes
+            for pa in order_data.get("product_attributes", []):
+                pa_rows.append(dict(zip(_PA_COLUMNS, _PA_FIELDS(pa)), return_id=return_id))
+        
+            # Store tracking info
+            for ti in order_data.get("tracking_info", []):
+                row = dict(zip(_TI_COLUMNS, _TI_FIELDS(ti)), return_id=return_id)
+                row["shipped_date"] = parse_datetime(row["shipped_date"])
+                row["delivery_note_date"] = parse_datetime(row["delivery_note_date"])
+                ti_rows.append(row)
+        
+            order_details_stored += 1
+    
+        # One executemany INSERT per table, bypassing ORM bookkeeping
+        for stmt, rows in (
+            (_GD_INSERT, gd_rows),
+            (_PD_INSERT, pd_rows),
+            (_PS_INSERT, ps_rows),
+            (_PA_INSERT, pa_rows),
+            (_TI_INSERT, ti_rows),
+        ):
+            if rows:
+                self.db.execute(stmt, rows)
+        
+        return found_ids, missing_ids, order_details_stored
+
+    def _run_tracking_update(self, service_cls) -> Dict[str, Any]:
+        """
+        Run a tracking service's update_all_tracking in its own Session.
+        
+        Meant for a worker thread: Sessions must not be shared across threads,
+        so this opens its own Session from the repo's SessionLocal factory
+        (autoflush=False, as the tracking services expect).
+        
+        Args:
+            service_cls: DHLTrackingService or DPDTrackingService
+            
+        Returns:
+            The service's tracking summary dict
+        """
+        with SessionLocal() as db:
+            return service_cls(db).update_all_tracking()
+    
     async def run_cycle(self, days_back: int = 90) -> Dict[str, Any]:
         """
         Run a complete processing cycle.
@@ -106,7 +276,7 @@ class ReturnFlow:
         Returns:
             Summary dict with step results and any errors
         """
-        logger.info(f"=== Starting Return Processing Cycle (days_back={days_back}) ===")
+        logger.info("=== Starting Return Processing Cycle (days_back=%d) ===", days_back)
         
         summary = {
             "status": "success",
@@ -135,6 +305,11 @@ class ReturnFlow:
                 summary["errors"].append(f"Session initialization failed: {str(e)}")
                 return summary
                 
+            # Blocking DB / JTL work below runs in the default executor so the
+            # event loop stays responsive; steps still run one after another,
+            # so self.db is never used from two threads at once
+            loop = asyncio.get_running_loop()
+            
             # Create services with session and retry handler
             amazon_client = AmazonClient(session)
             retry_handler = RetryWithSessionReset(session_manager, amazon_client)
@@ -161,7 +336,7 @@ class ReturnFlow:
                     "new": new_count
                 }
                 self._update_progress("fetch_returns", 1, {"total": total_fetched, "new": new_count})
-                logger.info(f"Fetched {total_fetched} returns ({new_count} new)")
+                logger.info("Fetched %d returns (%d new)", total_fetched, new_count)
             except HTTPError as e:
                 logger.error(f"Fetch failed: {e}")
                 summary["steps"]["fetch"] = {"status": "error", "error": str(e)}
@@ -173,6 +348,24 @@ class ReturnFlow:
                 summary["errors"].append(f"Fetch step failed: {str(e)}")
    
             
+            # Start the Step 3 JTL fetch in a worker thread so it overlaps with
+            # Step 2's Amazon calls. JTL access doesn't touch self.db, so this
+            # is the only part of Steps 2-6 that can safely run concurrently.
+            # order_id is NOT NULL but can be blank; such returns can't be looked
+            # up, so Step 3 never loads them (they stay PENDING_RMA as before)
+            pending_rma_filter = and_(
+                AmazonReturn.internal_status == InternalStatus.PENDING_RMA,
+                AmazonReturn.order_id != ""
+            )
+            prefetch_order_ids = [
+                order_id for (order_id,) in self.db.query(AmazonReturn.order_id).filter(pending_rma_filter)
+            ]
+            jtl_prefetch = None
+            if prefetch_order_ids:
+                jtl_prefetch = loop.run_in_executor(
+                    None, jtl_service.get_all_order_data_batch, prefetch_order_ids
+                )
+            
             # ============================================================
             # STEP 2: Fetch addresses
             # ============================================================
@@ -196,133 +389,105 @@ class ReturnFlow:
             logger.info("Step 3: Performing RMA lookup and fetching order details from JTL...")
             self._update_progress("rma_lookup", 3)
             
-            # Import order detail models
-            from models.order_details import (
-                OrderGeneralDetails, OrderProductDescription,
-                OrderProductSpec, OrderProductAttribute, OrderTrackingInfo
+            # Step 2 only ever moves returns out of PENDING_RMA, so an empty
+            # pre-Step-2 snapshot means an idle step - skip the COUNT as well
+            pending_count = (
+                self.db.query(func.count(AmazonReturn.id)).filter(pending_rma_filter).scalar()
+                if prefetch_order_ids else 0
             )
             
-            pending_rma_returns = self.db.query(AmazonReturn).filter(
-                AmazonReturn.internal_status == InternalStatus.PENDING_RMA
-            ).all()
+            logger.info("Found %d returns needing RMA lookup", pending_count)
             
-            logger.info(f"Found {len(pending_rma_returns)} returns needing RMA lookup")
-            
-            rma_found_count = 0
-            rma_not_found_count = 0
+            # Order IDs per outcome, logged once at the end of the step
+            found_ids = []
+            missing_ids = []
+            failed_chunks = 0
+            log_rows = logger.isEnabledFor(logging.DEBUG)
             order_details_stored = 0
             
-            if pending_rma_returns:
+            if pending_count:
                 try:
-                    for amazon_return in pending_rma_returns:
-                        order_id = amazon_return.order_id
-                        if not order_id:
-                            logger.warning(f"Return {amazon_return.return_request_id} has no order_id, skipping")
-                            continue
-                        
-                        # Fetch ALL order data from JTL (RMA + product details)
-                        order_data = jtl_service.get_all_order_data(order_id)
-                        
-                        # Update RMA status
-                        rma = order_data.get("internal_rma")
-                        if rma:
-                            amazon_return.internal_rma = rma
-                            amazon_return.internal_status = InternalStatus.RMA_RECEIVED
-                            rma_found_count += 1
-                            logger.info(f"  ✓ {order_id} -> RMA: {rma}")
-                        else:
-                            amazon_return.internal_status = InternalStatus.NO_RMA_FOUND
-                            rma_not_found_count += 1
-                            logger.warning(f"  ✗ {order_id} -> RMA not found")
-                        
-                        # Store all order details in database
-                        return_id = amazon_return.id
-                        
-                        # Store general details
-                        for gd in order_data.get("general_details", []):
-                            self.db.add(OrderGeneralDetails(
-                                return_id=return_id,
-                                jtl_order_id=gd.get("cOrderId"),
-                                purchase_date=self._parse_datetime(gd.get("dPurchaseDate")),
-                                status_code=gd.get("nStatus"),
-                                order_status=gd.get("cOrderStatus"),
-                                is_fba=bool(gd.get("nFBA")),
-                                is_prime=bool(gd.get("nPrime")),
-                                buyer_name=gd.get("cBuyerName"),
-                                buyer_email=gd.get("cBuyerEmail"),
-                                internal_order_number=gd.get("Internal_Order_Number"),
-                                sku=gd.get("SKU"),
-                                product_name=gd.get("Product_Name"),
-                                asin=gd.get("ASIN"),
-                                quantity_purchased=gd.get("nQuantityPurchased", 1)
-                            ))
-                        
-                        # Store product descriptions
-                        for pd in order_data.get("product_descriptions", []):
-                            self.db.add(OrderProductDescription(
-                                return_id=return_id,
-                                sku=pd.get("SKU"),
-                                internal_id=pd.get("Internal_ID"),
-                                display_name=pd.get("Display_Name"),
-                                description_html=pd.get("Description_HTML"),
-                                short_description=pd.get("Short_Description"),
-                                manufacturer=pd.get("Manufacturer"),
-                                ean=pd.get("EAN"),
-                                mpn=pd.get("MPN")
-                            ))
-                        
-                        # Store product specs
-                        for ps in order_data.get("product_specs", []):
-                            self.db.add(OrderProductSpec(
-                                return_id=return_id,
-                                sku=ps.get("SKU"),
-                                spec_name=ps.get("Spec_Name"),
-                                spec_value=ps.get("Spec_Value")
-                            ))
-                        
-                        # Store product attributes
-                        for pa in order_data.get("product_attributes", []):
-                            self.db.add(OrderProductAttribute(
-                                return_id=return_id,
-                                sku=pa.get("SKU"),
-                                attribute_name=pa.get("Attribute_Name"),
-                                attribute_value=pa.get("Attribute_Value")
+                    # JTL data prefetched during Step 2 (keyed by order_id);
+                    # if that failed, each chunk queries JTL itself
+                    order_data_map = {}
+                    if jtl_prefetch:
+                        try:
+                            order_data_map = dict(await jtl_prefetch)
+                        except Exception as e:
+                            logger.warning(f"JTL prefetch failed, querying per chunk: {e}")
+                    
+                    # Walk pending returns in id-ordered chunks (keyset pagination),
+                    # committing and releasing each chunk to keep memory flat and
+                    # so a failing chunk doesn't discard the work of the others
+                    last_id = 0
+                    while True:
+                        # Only the columns this loop reads/writes (skips raw_data etc.)
+                        pending_rma_returns = (
+                            self.db.query(AmazonReturn)
+                            .options(load_only(
+                                AmazonReturn.id, AmazonReturn.order_id, AmazonReturn.return_request_id,
+                                AmazonReturn.internal_status, AmazonReturn.internal_rma
                             ))
+                            .filter(pending_rma_filter, AmazonReturn.id > last_id)
+                            .order_by(AmazonReturn.id)
+                            .limit(PENDING_RMA_CHUNK_SIZE)
+                            .all()
+                        )
+                        if not pending_rma_returns:
+                            break
+                        last_id = pending_rma_returns[-1].id
                         
-                        # Store tracking info
-                        for ti in order_data.get("tracking_info", []):
-                            self.db.add(OrderTrackingInfo(
-                                return_id=return_id,
-                                tracking_number=ti.get("Tracking_Number"),
-                                carrier_id=ti.get("Carrier"),
-                                shipped_date=self._parse_datetime(ti.get("Shipped_Date")),
-                                delivery_note_date=self._parse_datetime(ti.get("DeliveryNote_Date")),
-                                internal_order_number=ti.get("cAuftragsNr")
-                            ))
+                        try:
+                            chunk_found, chunk_missing, chunk_stored = await loop.run_in_executor(
+                                None, self._store_rma_chunk, pending_rma_returns, order_data_map, log_rows
+                            )
+                            self.db.commit()
+                        except Exception as e:
+                            # Only this chunk is lost; its returns stay PENDING_RMA for next cycle
+                            self.db.rollback()
+                            failed_chunks += 1
+                            logger.error(f"RMA lookup chunk ({len(pending_rma_returns)} returns, up to id {last_id}) failed: {e}")
+                            summary["errors"].append(f"RMA lookup chunk failed: {str(e)}")
+                        else:
+                            found_ids.extend(chunk_found)
+                            missing_ids.extend(chunk_missing)
+                            order_details_stored += chunk_stored
                         
-                        order_details_stored += 1
-                    
-                    self.db.commit()
+                        for amazon_return in pending_rma_returns:
+                            self.db.expunge(amazon_return)
                     
+                    rma_found_count = len(found_ids)
+                    rma_not_found_count = len(missing_ids)
                     summary["steps"]["rma_lookup"] = {
-                        "status": "success",
-                        "total": len(pending_rma_returns),
+                        "status": "success" if not failed_chunks else "partial",
+                        "failed_chunks": failed_chunks,
+                        "total": pending_count,
                         "found": rma_found_count,
                         "not_found": rma_not_found_count,
                         "order_details_stored": order_details_stored
                     }
                     self._update_progress("rma_lookup", 3, {
-                        "total": len(pending_rma_returns),
+                        "total": pending_count,
                         "found": rma_found_count,
                         "not_found": rma_not_found_count
                     })
-                    logger.info(f"RMA lookup complete: {rma_found_count} found, {rma_not_found_count} not found, {order_details_stored} order details stored")
+                    if found_ids:
+                        logger.info("  ✓ RMA found (%d): %s", len(found_ids), found_ids[:50])
+                    if missing_ids:
+                        logger.warning("  ✗ RMA not found (%d): %s", len(missing_ids), missing_ids[:50])
+                    logger.info(
+                        "RMA lookup complete: %d found, %d not found, %d order details stored",
+                        rma_found_count, rma_not_found_count, order_details_stored
+                    )
                     
                 except Exception as e:
                     logger.error(f"RMA lookup error: {e}")
                     summary["steps"]["rma_lookup"] = {"status": "error", "error": str(e)}
                     summary["errors"].append(f"RMA lookup failed: {str(e)}")
             else:
+                if jtl_prefetch:
+                    # Step 2 marked every prefetched return NOT_ELIGIBLE
+                    jtl_prefetch.cancel()
                 logger.info("No returns need RMA lookup")
                 summary["steps"]["rma_lookup"] = {"status": "skipped", "total": 0}
                 self._update_progress("rma_lookup", 3, {"total": 0, "skipped": True})     
@@ -333,28 +498,33 @@ class ReturnFlow:
             logger.info("Step 4: Checking for completed and already-labelled returns...")
             self._update_progress("status_check", 4)
             
-            completed_count = 0
-            already_labelled_count = 0
-            
-            # Check returns with RMA
-            returns_with_rma = self.db.query(AmazonReturn).filter(
-                AmazonReturn.internal_status == InternalStatus.RMA_RECEIVED
-            ).all()
-            
-            for ret in returns_with_rma:
-                # FIRST: Check if Amazon state is Completed (takes precedence)
-                # Completed returns also have tracking IDs, so check this first
-                if ret.return_request_state == ReturnRequestState.COMPLETED:
-                    ret.internal_status = InternalStatus.COMPLETED
-                    completed_count += 1
-                # SECOND: Check if Amazon already provided a tracking label (not completed yet)
-                elif ret.amazon_label and ret.amazon_label.carrier_tracking_id:
-                    ret.internal_status = InternalStatus.ALREADY_LABEL_SUBMITTED
-                    already_labelled_count += 1
+            # One UPDATE classifies both buckets: Amazon state Completed takes
+            # precedence (completed returns also carry tracking IDs), otherwise
+            # Amazon already provided a tracking label (not completed yet)
+            is_completed = AmazonReturn.return_request_state == ReturnRequestState.COMPLETED
+            has_amazon_label = AmazonReturn.amazon_label.has(
+                AmazonReturnLabel.carrier_tracking_id.isnot(None)
+                & (AmazonReturnLabel.carrier_tracking_id != "")
+            )
+            new_statuses = self.db.execute(
+                update(AmazonReturn)
+                .where(
+                    AmazonReturn.internal_status == InternalStatus.RMA_RECEIVED,
+                    or_(is_completed, has_amazon_label)
+                )
+                .values(internal_status=case(
+                    (is_completed, InternalStatus.COMPLETED),
+                    else_=InternalStatus.ALREADY_LABEL_SUBMITTED
+                ))
+                .returning(AmazonReturn.internal_status)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            completed_count = new_statuses.count(InternalStatus.COMPLETED)
+            already_labelled_count = len(new_statuses) - completed_count
             
             self.db.commit()
             
-            logger.info(f"✓ Marked {completed_count} as completed, {already_labelled_count} as already-labelled")
+            logger.info("✓ Marked %d as completed, %d as already-labelled", completed_count, already_labelled_count)
             summary["steps"]["status_check"] = {
                 "status": "success",
                 "completed": completed_count,
@@ -371,7 +541,7 @@ class ReturnFlow:
             logger.info("Step 5: Detecting duplicates...")
             self._update_progress("detect_duplicates", 5)
             try:
-                groups, duplicates = filter_service.detect_duplicates()
+                groups, duplicates = await loop.run_in_executor(None, filter_service.detect_duplicates)
                 summary["steps"]["duplicates"] = {
                     "status": "success",
                     "groups": groups,
@@ -388,13 +558,13 @@ class ReturnFlow:
             logger.info("Step 6: Filtering eligible returns...")
             self._update_progress("filter_eligible", 6)
             try:
-                eligible_returns = filter_service.get_returns_for_processing()
+                eligible_returns = await loop.run_in_executor(None, filter_service.get_returns_for_processing)
                 summary["steps"]["filter"] = {
                     "status": "success",
                     "eligible_count": len(eligible_returns)
                 }
                 self._update_progress("filter_eligible", 6, {"eligible_count": len(eligible_returns)})
-                logger.info(f"Found {len(eligible_returns)} eligible returns")
+                logger.info("Found %d eligible returns", len(eligible_returns))
             except Exception as e:
                 logger.error(f"Filter error: {e}")
                 summary["steps"]["filter"] = {"status": "error", "error": str(e)}
@@ -435,36 +605,35 @@ class ReturnFlow:
                 summary["errors"].append(f"Label upload failed: {str(e)}")
 
             # ============================================================
-            # STEP 9: Update DHL Tracking
+            # STEP 9 / 9.5: Update DHL and DPD tracking
             # ============================================================
-            logger.info("Step 9: Updating DHL tracking data...")
+            # Both are blocking HTTP + DB work on disjoint carriers, so they run
+            # side by side in worker threads, each with its own Session
+            logger.info("Step 9 / 9.5: Updating DHL and DPD tracking data...")
             self._update_progress("update_tracking", 9)
+            self._update_progress("update_dpd_tracking", 9)
 
-            try:
-                tracking_service = DHLTrackingService(self.db)
-                tracking_result = tracking_service.update_all_tracking()
+            tracking_result, dpd_result = await asyncio.gather(
+                loop.run_in_executor(None, self._run_tracking_update, DHLTrackingService),
+                loop.run_in_executor(None, self._run_tracking_update, DPDTrackingService),
+                return_exceptions=True
+            )
+
+            if isinstance(tracking_result, Exception):
+                logger.error(f"Tracking step error: {tracking_result}", exc_info=tracking_result)
+                summary["steps"]["tracking"] = {"status": "error", "error": str(tracking_result)}
+                summary["errors"].append(f"Tracking update failed: {str(tracking_result)}")
+            else:
                 summary["steps"]["tracking"] = tracking_result
                 self._update_progress("update_tracking", 9, tracking_result)
-            except Exception as e:
-                logger.error(f"Tracking step error: {e}", exc_info=True)
-                summary["steps"]["tracking"] = {"status": "error", "error": str(e)}
-                summary["errors"].append(f"Tracking update failed: {str(e)}")
 
-            # ============================================================
-            # STEP 9.5: Update DPD Tracking
-            # ============================================================
-            logger.info("Step 9.5: Updating DPD tracking data...")
-            self._update_progress("update_dpd_tracking", 9)
-
-            try:
-                dpd_service = DPDTrackingService(self.db)
-                dpd_result = dpd_service.update_all_tracking()
+            if isinstance(dpd_result, Exception):
+                logger.error(f"DPD tracking step error: {dpd_result}", exc_info=dpd_result)
+                summary["steps"]["dpd_tracking"] = {"status": "error", "error": str(dpd_result)}
+                summary["errors"].append(f"DPD tracking update failed: {str(dpd_result)}")
+            else:
                 summary["steps"]["dpd_tracking"] = dpd_result
                 self._update_progress("update_dpd_tracking", 9, dpd_result)
-            except Exception as e:
-                logger.error(f"DPD tracking step error: {e}", exc_info=True)
-                summary["steps"]["dpd_tracking"] = {"status": "error", "error": str(e)}
-                summary["errors"].append(f"DPD tracking update failed: {str(e)}")
 
             # ============================================================
             # STEP 10: Update statistics
@@ -472,7 +641,7 @@ class ReturnFlow:
             logger.info("Step 10: Updating statistics...")
             self._update_progress("aggregation", 10)
             try:
-                agg_service.aggregate_all(days=days_back)
+                await loop.run_in_executor(None, partial(agg_service.aggregate_all, days=days_back))
                 summary["steps"]["aggregation"] = {"status": "success"}
                 self._update_progress("aggregation", 10, {"status": "completed"})
             except Exception as e:
@@ -488,8 +657,9 @@ class ReturnFlow:
             else:
                 summary["status"] = "success"
                 
-            logger.info(f"=== Cycle Complete ===")
-            logger.info(f"Summary: {summary}")
+            logger.info("=== Cycle Complete ===")
+            # Deferred: the nested summary is only repr()d if INFO is enabled
+            logger.info("Summary: %s", summary)
             
             return summary
             
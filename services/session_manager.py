@@ -3,25 +3,31 @@ Session Manager - Browser-based Amazon authentication.
 
 Handles login, session maintenance, and cookie persistence.
 Key features:
-- Fresh login for each processing cycle (via hard_reset + ensure_session)
+- One browser reused across cycles; login only when the session is gone
 - Nodriver-based browser automation
 - Cookie extraction for API calls
 - Robust error handling with exponential backoff
 - Proper browser process cleanup
 - Browser profile stored in ./Browser/profile
-- Cookies stored in ./Browser/amazonCookies.pkl
+- Cookies stored in ./Browser/amazonCookies.json
 """
 
 import asyncio
 import logging
 import os
 import pickle
+import random
 import threading
 import time
-from datetime import datetime
+import weakref
+import zlib
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
+import orjson
+import psutil
 import requests
 import pyotp
 
@@ -37,6 +43,44 @@ except ImportError:
     logger.warning("nodriver not installed, browser automation unavailable")
 
 
+# Cookie attributes persisted to the cookie file - the same ones nodriver's
+# requests_cookie_format sets, so the round trip is lossless
+_COOKIE_FIELDS = ("name", "value", "domain", "path", "expires", "secure")
+# Cookie file v2: this header + zlib(level 1) of the JSON cookie list
+_COOKIE_FILE_V2_HEADER = b"v2\n"
+
+# Seller Central page used to check whether a session is logged in
+RETURNS_LIST_URL = 'https://sellercentral.amazon.de/gp/returns/list/v2'
+
+# Which sign-in form elements the current page shows, in one CDP round trip
+LOGIN_STATE_JS = '''(() => {
+    const q = s => document.querySelector(s);
+    return {
+        email: !!q('input[name="email"]'),
+        emailHidden: !!q('input[name="email"]')?.hidden,
+        password: !!q('input[name="password"]'),
+        rememberMe: !!q('input[name="rememberMe"]'),
+        signIn: !!q('#signInSubmit'),
+        rememberDevice: !!q('#auth-mfa-remember-device'),
+        otpSignIn: !!q('#auth-signin-button'),
+        accountSwitcher: location.href.includes('account-switcher'),
+    };
+})()'''
+
+# Account switcher: pick the Germany account, then confirm the selection
+SELECT_GERMANY_JS = '''(() => {
+    for (const el of document.getElementsByClassName('full-page-account-switcher-account-details')) {
+        if (el.innerText.includes('Germany')) { el.click(); return true; }
+    }
+    return false;
+})()'''
+SUBMIT_ACCOUNT_JS = '''document.getElementsByClassName('full-page-account-switcher-button')[0].click();'''
+
+# Short pause between keystroke/click actions - Amazon's sign-in JS drops
+# input that arrives too fast, but it needs nowhere near full seconds
+INPUT_PAUSE_RANGE = (0.2, 0.5)
+
+
 class SessionExpiredError(Exception):
     """Raised when Amazon session has expired."""
     pass
@@ -46,19 +90,22 @@ class SessionManager:
     """
     Manages Amazon Seller Central session via browser automation.
     
-    Lifecycle (fresh login each cycle):
-    1. Call hard_reset() at start of each worker cycle
-    2. Call init_session_for_cycle() to perform fresh login
-    3. Use get_session() to get requests.Session for API calls
-    4. Call stop_browser() at end of cycle
+    Lifecycle:
+    1. Call init_session_for_cycle() at the start of each worker cycle;
+       cached cookies that pass an HTTP probe are used as-is, otherwise
+       it reuses the running browser and only logs in if signed out
+    2. Use get_session() to get requests.Session for API calls
+    3. hard_reset() (or reset_session()) only after an auth failure
     
     Browser data is stored in:
     - Profile: ./Browser/profile
-    - Cookies: ./Browser/amazonCookies.pkl
+    - Cookies: ./Browser/amazonCookies.json
     """
     
     _instance: Optional['SessionManager'] = None
     _lock = threading.Lock()
+    # Set once the singleton's __init__ has run; later calls return at once
+    _init_done = False
     
     # Maximum total time for login attempts (10 minutes)
     MAX_LOGIN_TIME_SECONDS = 600
@@ -69,36 +116,51 @@ class SessionManager:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
-                    cls._instance._initialized = False
         return cls._instance
     
     def __init__(self):
         """Initialize session manager with paths from config."""
-        if self._initialized:
+        if type(self)._init_done:
             return
         
         # Use paths from config (./Browser folder)
         self.browser_dir = settings.BROWSER_DIR
         self.data_dir = settings.BROWSER_PROFILE_DIR
         self.cookie_path = settings.AMAZON_COOKIE_FILE
+        # Pre-JSON cookie file (pickled requests.Session), migrated once on startup
+        self.legacy_cookie_path = os.path.splitext(self.cookie_path)[0] + ".pkl"
+        self._migrate_legacy_cookie_file()
+        # Tracked on write/delete so health checks don't stat the file
+        self._cookie_exists = os.path.exists(self.cookie_path)
         
         self.browser: Optional['nodriver.Browser'] = None
         self._session: Optional[requests.Session] = None
         self._session_valid = False
+        # Wall-clock time for display; monotonic time for age math
         self._last_refresh: Optional[datetime] = None
-        self._refresh_lock = asyncio.Lock()
-        self._operation_lock = asyncio.Lock()
+        self._last_refresh_mono: Optional[float] = None
+        # In-flight init_session_for_cycle() that concurrent callers join
+        self._session_init_future: Optional[asyncio.Future] = None
+        # In-flight reset_session() (hard reset + settle + re-login) that
+        # concurrent callers join instead of resetting again
+        self._session_reset_future: Optional[asyncio.Future] = None
+        # Background tasks nodriver spawns, registered by the loop task factory
+        self._browser_tasks: 'weakref.WeakSet[asyncio.Task]' = weakref.WeakSet()
+        self._tracked_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Browser start-up kicked off by hard_reset() to overlap the retry wait
+        self._prewarming: Optional[asyncio.Task] = None
         
         # Credentials
         self.email = settings.AMAZON_EMAIL
         self.password = settings.AMAZON_PASSWORD
         self.otp_secret = settings.AMAZON_2FA_SECRET
+        self._totp = pyotp.TOTP(self.otp_secret) if self.otp_secret else None
         
         # Ensure Browser directories exist
         Path(self.browser_dir).mkdir(parents=True, exist_ok=True)
         Path(self.data_dir).mkdir(parents=True, exist_ok=True)
         
-        self._initialized = True
+        type(self)._init_done = True
         logger.info(f"SessionManager initialized:")
         logger.info(f"  Browser dir: {self.browser_dir}")
         logger.info(f"  Profile dir: {self.data_dir}")
@@ -111,6 +173,7 @@ class SessionManager:
             
         try:
             logger.info(f"Initializing browser with data_dir: {self.data_dir}")
+            self._track_browser_tasks()
             self.browser = await nodriver.start(
                 headless=headless,
                 sandbox=False,
@@ -123,6 +186,34 @@ class SessionManager:
             logger.error(f"Failed to initialize browser: {e}")
             raise
 
+    def _track_browser_tasks(self) -> None:
+        """
+        Register every task nodriver creates in self._browser_tasks.
+        
+        nodriver spawns listener/update tasks for the whole life of the
+        browser, so this hooks the loop's task factory rather than just
+        nodriver.start(); tasks from other modules pass through untracked.
+        """
+        loop = asyncio.get_running_loop()
+        if self._tracked_loop is loop:
+            return
+        
+        previous_factory = loop.get_task_factory()
+        browser_tasks = self._browser_tasks
+        
+        def task_factory(loop, coro, **kwargs):
+            if previous_factory is not None:
+                task = previous_factory(loop, coro, **kwargs)
+            else:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            frame = getattr(coro, 'cr_frame', None)
+            if frame is not None and frame.f_globals.get('__name__', '').startswith('nodriver'):
+                browser_tasks.add(task)
+            return task
+        
+        loop.set_task_factory(task_factory)
+        self._tracked_loop = loop
+
     async def is_logged_in(self) -> bool:
         """
         Check if the session is still active on Seller Central.
@@ -133,20 +224,20 @@ class SessionManager:
         if not self.browser:
             logger.warning("Browser not initialized.")
             return False
-       
-        url = 'https://sellercentral.amazon.de/gp/returns/list/v2'
         
         try:
-            page = await self.browser.get(url)
-            await asyncio.sleep(3)
+            page = await self.browser.get(RETURNS_LIST_URL)
+            await self._wait_ready(page)
             
-            # Check for sign-in form
-            signin_form = await page.select('form[name="signIn"]', timeout=10)
-            otp_form = await page.select('input[id="auth-mfa-otpcode"]', timeout=10)
-            country_select = await page.select('button.full-page-account-switcher-account-details', timeout=5)
-
+            # Probe for sign-in, OTP and account-switcher forms concurrently
+            probes = await asyncio.gather(
+                page.select('form[name="signIn"]', timeout=10),
+                page.select('input[id="auth-mfa-otpcode"]', timeout=10),
+                page.select('button.full-page-account-switcher-account-details', timeout=5),
+                return_exceptions=True,
+            )
             
-            if signin_form or otp_form or country_select:
+            if any(probe is not None and not isinstance(probe, BaseException) for probe in probes):
                 logger.warning("Browser is NOT logged in - login form detected.")
                 return False
             
@@ -157,33 +248,127 @@ class SessionManager:
             logger.warning("NOT logged in - will perform hard reset.")
             return False
 
+    async def _wait_ready(self, page, selector: Optional[str] = None, timeout: float = 15,
+                          previous_url: Optional[str] = None):
+        """
+        Wait until the page has finished loading instead of sleeping blindly.
+        
+        Polls document.readyState (and, with previous_url, until the tab has
+        navigated away from it), then waits for selector if one is given.
+        
+        Returns:
+            The matched element, or None if no selector/element within timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            if previous_url is None or page.url != previous_url:
+                try:
+                    if await page.evaluate("document.readyState") == "complete":
+                        break
+                except Exception:
+                    pass  # Execution context torn down mid-navigation
+            await asyncio.sleep(0.1)
+        
+        if selector:
+            return await page.select(selector, timeout=max(1, deadline - loop.time()))
+        return None
+
+    async def _input_pause(self):
+        """Brief jittered pause between form interactions."""
+        await asyncio.sleep(random.uniform(*INPUT_PAUSE_RANGE))
+
+    async def _probe_session(self, session: requests.Session) -> bool:
+        """
+        Check cached cookies with a plain HTTP request instead of the browser.
+        
+        Returns:
+            True if Seller Central answers 200; an expired session gets a
+            3xx to sign-in instead (redirects are not followed)
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(
+                None,
+                partial(session.get, RETURNS_LIST_URL, allow_redirects=False, timeout=10)
+            )
+        except requests.RequestException as e:
+            logger.warning(f"Session probe failed: {e}")
+            return False
+        
+        return response.status_code == 200
+
+    async def _login_state(self, page) -> dict:
+        """Snapshot the sign-in form elements present on the page (see LOGIN_STATE_JS)."""
+        state = await page.evaluate(LOGIN_STATE_JS, return_by_value=True)
+        return state if isinstance(state, dict) else {}
+
+    async def _use(self, page, selector: str, action, timeout: float = 5) -> bool:
+        """
+        Run action on the element matching selector, then drop the handle.
+        
+        nodriver elements keep references into the tab's DOM tree; releasing
+        each one right after use keeps repeated logins from accumulating them.
+        
+        Returns:
+            True if the element was found and action ran
+        """
+        element = await page.select(selector, timeout=timeout)
+        if element is None:
+            return False
+        try:
+            await action(element)
+        finally:
+            del element
+        return True
+
+    async def _click(self, element) -> None:
+        """Click element, then pause."""
+        await element.click()
+        await self._input_pause()
+
+    async def _type_into(self, element, text: str) -> None:
+        """Replace element's input with text."""
+        await element.clear_input()
+        await self._input_pause()
+        await element.send_keys(text)
+        await self._input_pause()
+
+    async def _enter_otp(self, element) -> None:
+        """Type the current TOTP code into the OTP box."""
+        if self._totp is None:
+            raise RuntimeError("OTP required but AMAZON_2FA_SECRET is not set")
+        otp_code = self._totp.now()
+        logger.info(f"Generated OTP code: {otp_code}")
+        await self._type_into(element, otp_code)
+
+    async def _close_extra_tabs(self) -> None:
+        """Close any tabs the login flow opened besides the main one."""
+        for tab in self.browser.tabs[1:]:
+            try:
+                await tab.close()
+            except Exception:
+                pass
+
     async def login(self) -> bool:
         """Login to Amazon Seller Central."""
         if not self.browser:
             raise RuntimeError("Browser not initialized")
             
         page = self.browser.tabs[0]
-        await asyncio.sleep(10)
         
         # Step 1: Handle email input
         try:
-            email_box = await page.select('input[name="email"]', timeout=10)
-            if email_box:
-                js = '''document.querySelector('input[name="email"]').hidden'''
-                is_email_box_hidden = await page.evaluate(js, return_by_value=True)
-                logger.info(f"Email box hidden status: {is_email_box_hidden.value}")
+            await self._wait_ready(page, 'input[name="email"], input[name="password"]', timeout=20)
+            state = await self._login_state(page)
+            if state.get("email"):
+                logger.info(f"Email box hidden status: {state.get('emailHidden')}")
                 
-                if not is_email_box_hidden.value:
-                    await email_box.clear_input()
-                    await asyncio.sleep(5)
-                    await email_box.send_keys(self.email)
-                    await asyncio.sleep(5)
+                if not state.get("emailHidden"):
+                    await self._use(page, 'input[name="email"]', partial(self._type_into, text=self.email))
                     
-                    continue_button = await page.select('input[id="continue"]', timeout=10)
-                    if continue_button:
-                        logger.info("Continue button found, clicking...")
-                        await continue_button.click()
-                        await asyncio.sleep(7)
+                    if await self._use(page, 'input[id="continue"]', self._click, timeout=10):
+                        logger.info("Continue button clicked.")
                     else:
                         logger.error("Continue button not found.")
                 else:
@@ -195,81 +380,59 @@ class SessionManager:
         
         # Step 2: Handle password input
         logger.info("Looking for password box...")
-        password_box = await page.select('input[name="password"]', timeout=10)
-        if password_box:
-            logger.info("Password box found.")
-            await password_box.clear_input()
-            await asyncio.sleep(5)
-            await password_box.send_keys(self.password)
-            await asyncio.sleep(5)
+        if await self._use(page, 'input[name="password"]', partial(self._type_into, text=self.password), timeout=15):
+            logger.info("Password entered.")
         else:
             logger.error("Password box not found.")
 
         try:
+            state = await self._login_state(page)
+            
             # Step 3: Check remember me checkbox
-            remember_me = await page.select('input[name="rememberMe"]', timeout=10)
-            if remember_me:
+            if state.get("rememberMe"):
                 logger.info("Remember me checkbox found, clicking...")
-                await remember_me.click()
-                await asyncio.sleep(5)
+                await self._use(page, 'input[name="rememberMe"]', self._click)
             
             # Step 4: Click sign in button
-            sign_in_button = await page.select('input[id="signInSubmit"]', timeout=10)
-            if sign_in_button:
+            if state.get("signIn"):
                 logger.info("Sign in button found, clicking...")
-                await sign_in_button.click()
-                await asyncio.sleep(10)
+                signin_url = page.url
+                await self._use(page, 'input[id="signInSubmit"]', self._click)
+                await self._wait_ready(page, previous_url=signin_url)
             
             # Step 5: Handle OTP if required
             logger.info("Checking for OTP box...")
-            otp_box = await page.select('input[id="auth-mfa-otpcode"]', timeout=15)
-            if otp_box:
-                logger.info("OTP box found, generating OTP...")
-                await asyncio.sleep(5)
-                await otp_box.clear_input()
-                await asyncio.sleep(5)
-                
-                totp = pyotp.TOTP(self.otp_secret)
-                otp_code = totp.now()
-                logger.info(f"Generated OTP code: {otp_code}")
-                await otp_box.send_keys(otp_code)
-                await asyncio.sleep(5)
-
-                remember_device = await page.select('input[id="auth-mfa-remember-device"]', timeout=10)
-                if remember_device:
+            if await self._use(page, 'input[id="auth-mfa-otpcode"]', self._enter_otp, timeout=15):
+                state = await self._login_state(page)
+                if state.get("rememberDevice"):
                     logger.info("Remember device checkbox found, clicking...")
-                    await remember_device.click()
-                    await asyncio.sleep(5)
+                    await self._use(page, 'input[id="auth-mfa-remember-device"]', self._click)
                 
-                otp_signin_button = await page.select('input[id="auth-signin-button"]', timeout=10)
-                if otp_signin_button:
+                if state.get("otpSignIn"):
                     logger.info("OTP sign in button found, clicking...")
-                    await asyncio.sleep(5)
-                    await otp_signin_button.click()
-                    await asyncio.sleep(10)
+                    otp_url = page.url
+                    await self._use(page, 'input[id="auth-signin-button"]', self._click)
+                    await self._wait_ready(page, previous_url=otp_url)
             else:
                 logger.info("OTP box not found, may not be required.")
             
             # Step 6: Select an account if prompted
             logger.info("Checking for account selection...")
-            if 'account-switcher' in page.url:
-                js_click = '''const all_elements=document.getElementsByClassName('full-page-account-switcher-account-details'); 
-                function country(){
-                for(let i=0;i<all_elements.length;i++){ if(all_elements[i].innerText.includes('Germany')){ all_elements[i].click(); return true; } } return false;
-                 } 
-                 country();'''
-                result = await page.evaluate(js_click)
+            state = await self._login_state(page)
+            if state.get("accountSwitcher"):
+                result = await page.evaluate(SELECT_GERMANY_JS)
                 if not result:
                     logger.error("Failed to select account for Germany.")
                     return False
                     
-                await asyncio.sleep(10)
-                submit_btn_click_js='''document.getElementsByClassName('full-page-account-switcher-button')[0].click();'''
-                await page.evaluate(submit_btn_click_js)
-                await asyncio.sleep(10)
+                await self._wait_ready(page, '.full-page-account-switcher-button', timeout=10)
+                switcher_url = page.url
+                await page.evaluate(SUBMIT_ACCOUNT_JS)
+                await self._wait_ready(page, previous_url=switcher_url)
             else:
                 logger.info("Account selection not required.")
                     
+            await self._close_extra_tabs()
             logger.info("Login process completed.")
             return True
             
@@ -293,13 +456,17 @@ class SessionManager:
             for cookie in requests_style_cookies:
                 session.cookies.set_cookie(cookie)
             
-            # Save to pickle file in Browser folder
-            with open(self.cookie_path, 'wb') as f:
-                pickle.dump(session, f)
+            # Save cookies as compressed JSON in Browser folder (file I/O off the event loop)
+            payload = _COOKIE_FILE_V2_HEADER + zlib.compress(orjson.dumps([
+                {field: getattr(cookie, field) for field in _COOKIE_FIELDS}
+                for cookie in session.cookies
+            ]), 1)
+            await asyncio.get_running_loop().run_in_executor(None, self._write_cookie_file, payload)
             
             self._session = session
             self._session_valid = True
-            self._last_refresh = datetime.utcnow()
+            self._last_refresh = datetime.now(timezone.utc)
+            self._last_refresh_mono = time.monotonic()
             
             logger.info(f"Cookies saved to {self.cookie_path}")
             return session
@@ -308,38 +475,91 @@ class SessionManager:
             logger.error(f"Failed to refresh cookies: {e}")
             return None
 
+    def _write_cookie_file(self, payload: bytes) -> None:
+        """
+        Atomically replace the cookie file with payload.
+        
+        Writes to a temp file in the same directory and os.replace()s it,
+        so a crash mid-write never leaves a torn cookie file behind.
+        """
+        tmp_path = f"{self.cookie_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.cookie_path)
+        self._cookie_exists = True
+
+    def _migrate_legacy_cookie_file(self) -> None:
+        """
+        One-shot upgrade of the old pickled cookie file to the v2 JSON format.
+        
+        Only runs while the JSON file doesn't exist yet; the pickle is
+        deleted afterwards so it's never unpickled again.
+        """
+        if os.path.exists(self.cookie_path) or not os.path.exists(self.legacy_cookie_path):
+            return
+        
+        try:
+            with open(self.legacy_cookie_path, 'rb') as f:
+                session = pickle.load(f)
+            payload = _COOKIE_FILE_V2_HEADER + zlib.compress(orjson.dumps([
+                {field: getattr(cookie, field) for field in _COOKIE_FIELDS}
+                for cookie in session.cookies
+            ]), 1)
+            self._write_cookie_file(payload)
+            os.remove(self.legacy_cookie_path)
+            logger.info(f"Migrated legacy cookie file {self.legacy_cookie_path} -> {self.cookie_path}")
+        except Exception as e:
+            logger.error(f"Failed to migrate legacy cookie file: {e}")
+
+    def _read_cookie_file(self) -> requests.Session:
+        """Build a requests.Session from the cookie file (v2 or plain JSON)."""
+        with open(self.cookie_path, 'rb') as f:
+            raw = f.read()
+        if raw.startswith(_COOKIE_FILE_V2_HEADER):
+            raw = zlib.decompress(raw[len(_COOKIE_FILE_V2_HEADER):])
+        cookies = orjson.loads(raw)
+        
+        session = requests.Session()
+        for cookie in cookies:
+            session.cookies.set_cookie(requests.cookies.create_cookie(**cookie))
+        return session
+
+    async def _prewarm_browser(self) -> None:
+        """Start the next browser in the background after a hard reset."""
+        try:
+            await self.init_browser()
+            logger.info("Browser pre-warmed after hard reset")
+        except Exception as e:
+            logger.warning(f"Browser pre-warm failed: {e}")
+
+    async def _join_prewarm(self) -> None:
+        """Wait for an in-flight pre-warm so a browser is never started twice."""
+        prewarm, self._prewarming = self._prewarming, None
+        if prewarm is not None:
+            await prewarm
+
     async def stop_browser(self):
         """Stop the browser process with thorough cleanup."""
+        await self._join_prewarm()
         if not self.browser:
             return
             
         logger.info("Stopping browser process...")
+        # Collect the process tree up front - once the parent exits its
+        # renderer/GPU children are reparented and can no longer be found
+        browser_procs = self._browser_process_tree(getattr(self.browser, '_process_pid', None))
         
         try:
-            # Cancel browser-related tasks
+            # Cancel the background tasks nodriver spawned
             try:
-                all_tasks = asyncio.all_tasks()
-                browser_tasks = []
-                
-                for task in all_tasks:
-                    coro = task.get_coro()
-                    coro_name = coro.__qualname__ if coro else ""
-                    
-                    if any(pattern in str(coro_name) for pattern in [
-                        'Browser.update_targets',
-                        'Browser._get_targets',
-                        'connection.send',
-                        'Tab.',
-                        'browser.'
-                    ]):
-                        browser_tasks.append(task)
-                
+                browser_tasks = [task for task in self._browser_tasks if not task.done()]
                 for task in browser_tasks:
-                    if not task.done():
-                        task.cancel()
+                    task.cancel()
                 
                 if browser_tasks:
-                    await asyncio.sleep(0.5)
+                    await asyncio.wait(browser_tasks, timeout=5)
                     logger.info(f"Cancelled {len(browser_tasks)} browser background tasks")
                     
             except Exception as e:
@@ -374,95 +594,156 @@ class SessionManager:
         finally:
             self.browser = None
             await asyncio.sleep(2)
+            
+            # browser.stop() only terminates the parent; make sure the whole
+            # tree is gone so chrome children don't pile up across resets
+            for proc in browser_procs:
+                try:
+                    proc.kill()
+                except psutil.Error:
+                    pass  # Already exited
+            self._remove_profile_locks()
         
         logger.info("Browser stopped.")
 
-    async def ensure_session(self, max_attempts: int = 10) -> Optional[requests.Session]:
+    def _browser_process_tree(self, pid: Optional[int]) -> list:
+        """Return the browser process and all its descendants."""
+        if not pid:
+            return []
+        try:
+            parent = psutil.Process(pid)
+            return [parent] + parent.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    def _remove_profile_locks(self) -> None:
+        """Remove stale Singleton* lock files chrome leaves in the profile dir."""
+        for lock in Path(self.data_dir).glob('Singleton*'):
+            try:
+                lock.unlink()
+            except OSError as e:
+                logger.debug(f"Could not remove profile lock {lock}: {e}")
+
+    async def ensure_session(self, max_attempts: Optional[int] = None) -> Optional[requests.Session]:
         """
-        Ensure a valid session exists with exponential backoff and time limit.
+        Ensure a valid session exists with jittered backoff and time limit.
+        
+        Waits between attempts use decorrelated jitter, so several workers
+        failing together do not retry against Amazon in lockstep.
         
         Args:
-            max_attempts: Maximum login attempts (default: 10)
+            max_attempts: Maximum login attempts (default: settings.LOGIN_MAX_ATTEMPTS)
         
         Returns:
             requests.Session if successful, None if all attempts fail
         """
-        async with self._operation_lock:
-            attempt = 0
-            start_time = time.time()
-            base_wait = 5
-            backoff_multiplier = 1.5
+        max_attempts = max_attempts or settings.LOGIN_MAX_ATTEMPTS
+        attempt = 0
+        start_time = time.time()
+        base_wait = settings.LOGIN_RETRY_BASE_WAIT
+        wait_cap = settings.LOGIN_RETRY_WAIT_MAX
+        wait_time = base_wait
+        
+        # Cookies that still work over plain HTTP need no browser at all
+        cached = self.get_session()
+        if cached and await self._probe_session(cached):
+            logger.info("Cached session still valid - skipping browser check")
+            self._session_valid = True
+            return cached
+        
+        while attempt < max_attempts:
+            elapsed = time.time() - start_time
+            if elapsed >= self.MAX_LOGIN_TIME_SECONDS:
+                logger.error(f"Login timeout: exceeded {self.MAX_LOGIN_TIME_SECONDS}s limit")
+                return None
             
-            while attempt < max_attempts:
-                elapsed = time.time() - start_time
-                if elapsed >= self.MAX_LOGIN_TIME_SECONDS:
-                    logger.error(f"Login timeout: exceeded {self.MAX_LOGIN_TIME_SECONDS}s limit")
-                    return None
+            attempt += 1
+            logger.info(f"=== Login attempt {attempt}/{max_attempts} (elapsed: {elapsed:.0f}s) ===")
+            
+            try:
+                # The browser is kept across cycles; only a browser whose
+                # process has exited is replaced (no login attempt, no reset)
+                await self._join_prewarm()
+                if self.browser and self.browser.stopped:
+                    logger.warning("Browser process has exited - starting a new one")
+                    await self.stop_browser()
+                if not self.browser:
+                    await self.init_browser()
                 
-                attempt += 1
-                logger.info(f"=== Login attempt {attempt}/{max_attempts} (elapsed: {elapsed:.0f}s) ===")
+                if await self.is_logged_in():
+                    logger.info("Already logged in!")
+                    return await self.refresh_cookies()
                 
-                try:
-                    if not self.browser:
-                        await self.init_browser()
+                logger.info("Not logged in, performing login...")
+                login_success = await self.login()
+                
+                if login_success:
+                    logger.info("Login completed, verifying with API...")
                     
                     if await self.is_logged_in():
-                        logger.info("Already logged in!")
+                        logger.info(f"Login verified on attempt {attempt}!")
                         return await self.refresh_cookies()
-                    
-                    logger.info("Not logged in, performing login...")
-                    login_success = await self.login()
-                    
-                    if login_success:
-                        logger.info("Login completed, verifying with API...")
-                        
-                        if await self.is_logged_in():
-                            logger.info(f"Login verified on attempt {attempt}!")
-                            return await self.refresh_cookies()
-                        else:
-                            logger.warning("Login verification failed.")
                     else:
-                        logger.warning("Login returned False.")
-                    
-                    logger.error(f"Login attempt {attempt} failed, performing hard reset...")
-                    await self.hard_reset()
-                    
-                    wait_time = min(60, base_wait * (backoff_multiplier ** (attempt - 1)))
-                    logger.info(f"Waiting {wait_time:.0f}s before retry (exponential backoff)...")
-                    await asyncio.sleep(wait_time)
-                    
-                except Exception as e:
-                    logger.error(f"Error during login attempt {attempt}: {e}")
-                    await self.hard_reset()
-                    
-                    wait_time = min(60, base_wait * (backoff_multiplier ** (attempt - 1)))
-                    await asyncio.sleep(wait_time)
-            
-            logger.error(f"All {max_attempts} login attempts failed!")
-            return None
+                        logger.warning("Login verification failed.")
+                else:
+                    logger.warning("Login returned False.")
+                
+                logger.error(f"Login attempt {attempt} failed, performing hard reset...")
+                await self.hard_reset()
+                
+                wait_time = min(wait_cap, random.uniform(base_wait, wait_time * 3))
+                logger.info(f"Waiting {wait_time:.0f}s before retry (jittered backoff)...")
+                await asyncio.sleep(wait_time)
+                
+            except Exception as e:
+                logger.error(f"Error during login attempt {attempt}: {e}")
+                await self.hard_reset()
+                
+                wait_time = min(wait_cap, random.uniform(base_wait, wait_time * 3))
+                await asyncio.sleep(wait_time)
+        
+        logger.error(f"All {max_attempts} login attempts failed!")
+        return None
 
     async def init_session_for_cycle(self) -> requests.Session:
         """
         Initialize/refresh session at the start of a worker cycle.
         
+        Concurrent callers coalesce onto one in-flight initialization: the
+        first caller performs it, everyone else awaits its result.
+        
         Raises:
             SessionExpiredError: If unable to establish valid session
         """
-        async with self._refresh_lock:
-            logger.info("=== Initializing session for new cycle ===")
+        pending = self._session_init_future
+        if pending is not None and not pending.done():
+            logger.info("Session initialization already in flight - waiting for it...")
+            session = await asyncio.shield(pending)
+            if session is None:
+                raise SessionExpiredError("Session initialization failed")
+            return session
+        
+        future = asyncio.get_running_loop().create_future()
+        self._session_init_future = future
+        session = None
+        logger.info("=== Initializing session for new cycle ===")
+        
+        try:
+            session = await self.ensure_session()
             
-            try:
-                session = await self.ensure_session()
-                
-                if session is None:
-                    raise SessionExpiredError("Failed to establish Amazon session")
-                
-                logger.info(f"Session initialized successfully at {self._last_refresh}")
-                return session
-                
-            except Exception as e:
-                logger.error(f"Failed to init session for cycle: {e}")
-                raise SessionExpiredError(f"Session initialization failed: {e}")
+            if session is None:
+                raise SessionExpiredError("Failed to establish Amazon session")
+            
+            logger.info(f"Session initialized successfully at {self._last_refresh}")
+            return session
+            
+        except Exception as e:
+            logger.error(f"Failed to init session for cycle: {e}")
+            raise SessionExpiredError(f"Session initialization failed: {e}")
+        finally:
+            # Waiters get None on failure and raise on their own
+            future.set_result(session)
+            self._session_init_future = None
 
     async def hard_reset(self) -> None:
         """
@@ -470,8 +751,9 @@ class SessionManager:
         
         Steps:
         1. Stop browser with thorough cleanup
-        2. Delete pickle cookie file
+        2. Delete cookie file
         3. Clear all session state
+        4. Start pre-warming the next browser in the background
         """
         logger.warning("=== HARD RESET: Clearing all session data ===")
         
@@ -480,6 +762,7 @@ class SessionManager:
         if os.path.exists(self.cookie_path):
             try:
                 os.remove(self.cookie_path)
+                self._cookie_exists = False
                 logger.info(f"Deleted cookie file: {self.cookie_path}")
             except Exception as e:
                 logger.error(f"Failed to delete cookie file: {e}")
@@ -487,27 +770,68 @@ class SessionManager:
         self._session = None
         self._session_valid = False
         self._last_refresh = None
+        self._last_refresh_mono = None
+        
+        # The next login needs a fresh browser anyway; starting it now hides
+        # its start-up behind the retry/settle wait that follows a reset
+        if nodriver is not None:
+            self._prewarming = asyncio.create_task(self._prewarm_browser())
         
         logger.info("Hard reset complete - session fully cleared")
 
+    async def reset_session(self, settle_seconds: float) -> Optional[requests.Session]:
+        """
+        Hard reset followed by a fresh login, safe to call concurrently.
+        
+        The reset is marked in flight before hard_reset() runs, so callers
+        arriving at any point until the re-login finishes - including
+        during the settle wait - join it instead of resetting again.
+        
+        Args:
+            settle_seconds: Cooldown between hard reset and re-login
+        
+        Returns:
+            Fresh requests.Session, or None if re-initialization failed
+        """
+        pending = self._session_reset_future
+        if pending is not None and not pending.done():
+            logger.info("Session reset already in flight - waiting for it...")
+            return await asyncio.shield(pending)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._session_reset_future = future
+        session = None
+        
+        try:
+            await self.hard_reset()
+            
+            logger.info(f"Waiting {settle_seconds}s for session reset cooldown...")
+            await asyncio.sleep(settle_seconds)
+            
+            session = await self.init_session_for_cycle()
+            return session
+        finally:
+            # Waiters get None on failure
+            future.set_result(session)
+            self._session_reset_future = None
+
     def get_session(self) -> Optional[requests.Session]:
         """
         Get the current requests session (synchronous).
         
-        Returns the in-memory session or loads from pickle if available.
+        Returns the in-memory session or loads from the cookie file if available.
         """
         if self._session and self._session_valid:
             return self._session
             
         try:
             if os.path.exists(self.cookie_path):
-                with open(self.cookie_path, 'rb') as f:
-                    self._session = pickle.load(f)
-                    self._session_valid = True
-                    logger.info("Session loaded from cookie file")
-                    return self._session
+                self._session = self._read_cookie_file()
+                self._session_valid = True
+                logger.info("Session loaded from cookie file")
+                return self._session
         except Exception as e:
-            logger.error(f"Failed to load session from pickle: {e}")
+            logger.error(f"Failed to load session from cookie file: {e}")
             
         return None
 
@@ -526,13 +850,21 @@ class SessionManager:
         """Get timestamp of last session refresh."""
         return self._last_refresh
 
+    @property
+    def session_age_seconds(self) -> Optional[float]:
+        """Seconds since the last cookie refresh (immune to wall-clock jumps)."""
+        if self._last_refresh_mono is None:
+            return None
+        return time.monotonic() - self._last_refresh_mono
+
     def get_status(self) -> dict:
         """Get session manager status for health checks."""
         return {
             "session_valid": self._session_valid,
             "browser_active": self.browser is not None,
             "last_refresh": self._last_refresh.isoformat() if self._last_refresh else None,
-            "cookie_file_exists": os.path.exists(self.cookie_path),
+            "session_age_seconds": self.session_age_seconds,
+            "cookie_file_exists": self._cookie_exists,
             "browser_dir": self.browser_dir,
             "profile_dir": self.data_dir,
             "max_login_time": self.MAX_LOGIN_TIME_SECONDS
@@ -13,11 +13,20 @@ Handles the complete upload flow:
 9. Refetch return to get latest state
 """
 
+import asyncio
 import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer, selectinload
+
+from config import settings
 
 from models.amazon_return import (
     AmazonReturn,
@@ -25,15 +34,75 @@ from models.amazon_return import (
     InternalStatus,
     LabelState,
 )
-from services.amazon_client import AmazonClient, HTTPError
+from services.amazon_client import AmazonClient, HTTPError, SessionExpiredError
 from services.label_service import S3Service
 from utils import convert_pdf_to_png_bytes, parse_csrf, generate_s3_key
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # Constant merchant party ID - doesn't need to be stored in database
 MERCHANT_PARTY_ID = "A3TZZ7DOC6G9UH"
 
+# CSRF tokens by Amazon session-id: Amazon rotates the token per session,
+# not per request, so one fetch serves every cycle until it goes stale
+CSRF_CACHE_TTL_SECONDS = 600
+CSRF_CACHE_MAX_ENTRIES = 32
+# Statuses Amazon answers a stale CSRF token / session with - worth one retry
+CSRF_RETRY_STATUSES = (401, 403)
+_csrf_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+# PDF->PNG runs in worker processes: PyMuPDF holds the GIL (and isn't
+# thread-safe), so concurrent uploads would otherwise convert one at a time.
+# Spawned, not forked: by the time the pool starts the worker is full of
+# threads (executors, boto3, the browser) whose held locks a fork would copy
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+# Converted label PNGs by our S3 key. Keys embed a fresh UUID per generated
+# label and are never overwritten, so a retried upload (same or later cycle)
+# can skip the S3 download and rasterisation entirely
+LABEL_PNG_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_label_png_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_label_png_cache_bytes = 0
+
+
+def _cache_label_png(s3_key: str, label_png: bytes) -> None:
+    """Store a converted PNG, evicting least recently used entries over the byte budget."""
+    global _label_png_cache_bytes
+    previous = _label_png_cache.pop(s3_key, None)
+    if previous is not None:
+        _label_png_cache_bytes -= len(previous)
+    _label_png_cache[s3_key] = label_png
+    _label_png_cache_bytes += len(label_png)
+    while _label_png_cache_bytes > LABEL_PNG_CACHE_MAX_BYTES and len(_label_png_cache) > 1:
+        _, evicted = _label_png_cache.popitem(last=False)
+        _label_png_cache_bytes -= len(evicted)
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Lazily create the shared PDF conversion process pool."""
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                workers = max(1, min(settings.UPLOAD_CONCURRENCY, os.cpu_count() or 1))
+                _pdf_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pdf_pool
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the PDF conversion processes (worker shutdown)."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        pool, _pdf_pool = _pdf_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
 
 class UploadService:
     """
@@ -56,30 +125,181 @@ class UploadService:
         self.amazon_client = amazon_client
         self.s3_service = S3Service()
         self._csrf_token: Optional[str] = None
+        # Concurrent uploads wait for the first CSRF fetch instead of each fetching
+        self._csrf_lock = asyncio.Lock()
         
-    async def _get_csrf_token(self) -> str:
-        """Get CSRF token from Amazon."""
+    def _cached_csrf_token(self) -> Optional[str]:
+        """Return this instance's token, or a fresh one cached for the same session."""
         if self._csrf_token:
             return self._csrf_token
-            
-        # Fetch returns page to get CSRF
-        session = self.amazon_client.session
-        if not session:
-            raise HTTPError("No session available", 401)
-            
-        url = "https://sellercentral.amazon.de/gp/returns/list/v2"
-        response = session.get(url)
         
-        if response.status_code != 200:
-            raise HTTPError(f"Failed to get CSRF: {response.status_code}", response.status_code)
-            
-        csrf = parse_csrf(response.text)
-        if not csrf:
-            raise HTTPError("CSRF token not found in response", 500)
+        key = self.amazon_client.session_key
+        entry = _csrf_cache.get(key) if key else None
+        if entry and entry[0] > time.monotonic():
+            self._csrf_token = entry[1]
+        return self._csrf_token
+    
+    def _invalidate_csrf_token(self, stale: str) -> None:
+        """
+        Forget a rejected CSRF token so the next call refetches it.
+        
+        Only drops it if it is still the current one - a concurrent upload
+        may already have replaced it with a fresh token.
+        """
+        if self._csrf_token == stale:
+            self._csrf_token = None
+        key = self.amazon_client.session_key
+        entry = _csrf_cache.get(key) if key else None
+        if entry and entry[1] == stale:
+            del _csrf_cache[key]
+        
+    async def _get_csrf_token(self) -> str:
+        """Get CSRF token from Amazon (cached per Amazon session)."""
+        if self._cached_csrf_token():
+            return self._csrf_token
+        
+        async with self._csrf_lock:
+            if self._cached_csrf_token():
+                return self._csrf_token
+            
+            # Fetch returns page to get CSRF
+            session = self.amazon_client.session
+            if not session:
+                raise HTTPError("No session available", 401)
+                
+            url = "https://sellercentral.amazon.de/gp/returns/list/v2"
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(None, session.get, url)
             
-        self._csrf_token = csrf
-        logger.info(f"[Upload] CSRF token obtained: {csrf[:10]}...")
-        return csrf
+            if response.status_code != 200:
+                raise HTTPError(f"Failed to get CSRF: {response.status_code}", response.status_code)
+                
+            csrf = parse_csrf(response.text)
+            if not csrf:
+                raise HTTPError("CSRF token not found in response", 500)
+                
+            self._csrf_token = csrf
+            key = self.amazon_client.session_key
+            if key:
+                _csrf_cache[key] = (time.monotonic() + CSRF_CACHE_TTL_SECONDS, csrf)
+                _csrf_cache.move_to_end(key)
+                while len(_csrf_cache) > CSRF_CACHE_MAX_ENTRIES:
+                    _csrf_cache.popitem(last=False)
+            logger.info(f"[Upload] CSRF token obtained: {csrf[:10]}...")
+            return csrf
+        
+    async def _get_label_png(self, s3_key: str) -> bytes:
+        """Download a label PDF from our S3 and convert it to PNG (cached by S3 key)."""
+        label_png = _label_png_cache.get(s3_key)
+        if label_png is not None:
+            _label_png_cache.move_to_end(s3_key)
+            logger.info(f"[Upload] ✅ Reusing converted PNG for {s3_key}: {len(label_png)} bytes")
+            return label_png
+        
+        label_pdf = await self.s3_service.get_label_async(s3_key)
+        if not label_pdf:
+            raise Exception(f"Failed to download label from S3: {s3_key}")
+        logger.info(f"[Upload] ✅ Downloaded {len(label_pdf)} bytes")
+        
+        # CPU-bound, in the PDF process pool
+        loop = asyncio.get_running_loop()
+        label_png = await loop.run_in_executor(_get_pdf_pool(), convert_pdf_to_png_bytes, label_pdf)
+        logger.info(f"[Upload] ✅ Converted to PNG: {len(label_png)} bytes")
+        
+        _cache_label_png(s3_key, label_png)
+        return label_png
+        
+    async def _with_csrf_retry(self, call: Callable[[str], Awaitable[T]]) -> T:
+        """
+        Run one CSRF-bearing Seller Central request, refreshing a stale token once.
+        
+        The CSRF token is cached across cycles; Amazon answers a stale one
+        with a 401/403 and does nothing else, so only this request is
+        repeated with a fresh token - never steps with side effects before it.
+        
+        Args:
+            call: Takes the CSRF token and performs the request
+        """
+        csrf = await self._get_csrf_token()
+        try:
+            return await call(csrf)
+        except SessionExpiredError as e:
+            if e.status_code not in CSRF_RETRY_STATUSES:
+                raise
+            logger.warning(f"[Upload] {e} - refetching CSRF and retrying once")
+            self._invalidate_csrf_token(csrf)
+            return await call(await self._get_csrf_token())
+        
+    async def _upload_to_alexandria(
+        self,
+        amazon_return: AmazonReturn,
+        label_png: bytes,
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Steps 6-8: fetch return details, get Alexandria args and upload the PNG.
+        
+        Returns:
+            Tuple of (document_version_id, return_address_id)
+        """
+        # STEP 6: Get return details for customer_id, seller_id
+        logger.info("[Upload] Step 6: Getting return details...")
+        
+        particulars = await self.amazon_client.get_return_details(
+            return_request_id=amazon_return.return_request_id,
+            marketplace_id=amazon_return.marketplace_id,
+        )
+        
+        if not particulars:
+            raise Exception("Failed to get return details")
+        
+        ret_req = particulars.get('returnRequest', {})
+        customer_id = ret_req.get('customerId') or amazon_return.customer_id
+        seller_id = MERCHANT_PARTY_ID  # Constant - no need to fetch from API
+        address_id = ret_req.get('returnAddressId') or amazon_return.return_address_id
+        
+        if not customer_id:
+            raise Exception("Missing customerId for Alexandria upload")
+        
+        logger.info(f"[Upload] ✅ Customer: {customer_id}, Seller: {seller_id}")
+        
+        # STEP 7: Get Alexandria args
+        logger.info("[Upload] Step 7: Getting Alexandria args...")
+        
+        alex_args = await self._with_csrf_retry(lambda csrf: self.amazon_client.get_alexandria_args(
+            customer_id=customer_id,
+            marketplace_id=amazon_return.marketplace_id or "",
+            seller_id=seller_id,
+            return_request_id=amazon_return.return_request_id,
+            csrf=csrf,
+        ))
+        
+        if not alex_args:
+            raise Exception("Failed to get Alexandria args")
+        
+        logger.info("[Upload] ✅ Alexandria args obtained")
+        
+        # STEP 8: Upload to Alexandria
+        logger.info("[Upload] Step 8: Uploading to Alexandria...")
+        
+        alex_result = await self._with_csrf_retry(lambda csrf: self.amazon_client.alexandria_upload(
+            alex_args=alex_args,
+            label_png=label_png,
+            customer_id=customer_id,
+            seller_id=seller_id,
+            marketplace_id=amazon_return.marketplace_id or "",
+            return_request_id=amazon_return.return_request_id,
+            csrf=csrf,
+        ))
+        
+        if not alex_result or not alex_result.get('success'):
+            raise Exception(f"Alexandria upload failed: {alex_result}")
+        
+        doc_version_id = alex_result.get('doc_version_id')
+        if not doc_version_id:
+            raise Exception("Alexandria upload succeeded but no document_version_id returned")
+        
+        logger.info(f"[Upload] ✅ Alexandria upload successful. DocId: {doc_version_id}")
+        return doc_version_id, address_id
         
     async def upload_label(self, amazon_return: AmazonReturn) -> bool:
         """
@@ -117,142 +337,73 @@ class UploadService:
         step = "init"
         try:
             # ============================================================
-            # STEP 1: Download label PDF from our S3
-            # ============================================================
-            step = "download_pdf"
-            logger.info(f"[Upload] Step 1: Downloading label from S3: {label.s3_key}")
-            
-            label_pdf = self.s3_service.get_label(label.s3_key)
-            if not label_pdf:
-                raise Exception(f"Failed to download label from S3: {label.s3_key}")
-            
-            logger.info(f"[Upload] ✅ Downloaded {len(label_pdf)} bytes")
-            
-            # ============================================================
-            # STEP 2: Convert PDF to PNG
-            # ============================================================
-            step = "convert_png"
-            logger.info("[Upload] Step 2: Converting PDF to PNG...")
-            
-            label_png = convert_pdf_to_png_bytes(label_pdf)
-            logger.info(f"[Upload] ✅ Converted to PNG: {len(label_png)} bytes")
-            
-            # ============================================================
-            # STEP 3: Get CSRF token
+            # STEPS 1-4: Download label PDF from our S3 and convert it to
+            # PNG, get CSRF token and Amazon S3 bucket args - independent,
+            # so run them together
             # ============================================================
-            step = "csrf"
-            logger.info("[Upload] Step 3: Getting CSRF token...")
-            csrf = await self._get_csrf_token()
-            
-            # ============================================================
-            # STEP 4: Get S3 bucket args from Amazon
-            # ============================================================
-            step = "s3_args"
-            logger.info("[Upload] Step 4: Getting Amazon S3 bucket args...")
-            
-            s3_args = await self.amazon_client.get_s3_bucket_args(
-                return_request_id=amazon_return.return_request_id,
-                marketplace_id=amazon_return.marketplace_id,
+            logger.info(f"[Upload] Steps 1-4: Preparing label {label.s3_key}, getting CSRF and S3 bucket args...")
+            
+            results = await asyncio.gather(
+                self._get_label_png(label.s3_key),
+                self._get_csrf_token(),
+                self.amazon_client.get_s3_bucket_args(
+                    return_request_id=amazon_return.return_request_id,
+                    marketplace_id=amazon_return.marketplace_id,
+                ),
+                return_exceptions=True,
             )
+            # Surface the first failure under its own step name
+            for step, result in zip(("label_png", "csrf", "s3_args"), results):
+                if isinstance(result, BaseException):
+                    raise result
+            label_png, csrf, s3_args = results
             
+            step = "s3_args"
             if not s3_args:
                 raise Exception("Failed to get S3 arguments from Amazon")
-            
             logger.info(f"[Upload] ✅ S3 bucket: {s3_args.get('bucketName')}")
             
             # ============================================================
-            # STEP 5: Upload PNG to Amazon's S3
+            # STEPS 5-8: Upload PNG to Amazon's S3 while the Alexandria
+            # chain runs - both only need the PNG and CSRF; complete_return
+            # needs both finished
             # ============================================================
             step = "s3_upload"
-            logger.info("[Upload] Step 5: Uploading to Amazon S3...")
+            logger.info("[Upload] Steps 5-8: Uploading to Amazon S3 and Alexandria...")
             
             # Generate unique S3 key for Amazon upload
             amazon_s3_key = generate_s3_key(amazon_return.return_request_id)
             
-            s3_upload_success = await self.amazon_client.upload_to_s3(
+            s3_task = asyncio.create_task(self.amazon_client.upload_to_s3(
                 s3_args=s3_args,
                 label_binary=label_png,
                 key=amazon_s3_key,
                 csrf=csrf,
-            )
-            
-            if not s3_upload_success:
-                raise Exception("S3 upload to Amazon failed")
+            ))
+            alex_task = asyncio.create_task(self._upload_to_alexandria(amazon_return, label_png))
+            try:
+                await asyncio.wait({s3_task, alex_task}, return_when=asyncio.FIRST_EXCEPTION)
+            finally:
+                # One side failed (or we were cancelled) - stop awaiting the other.
+                # This skips its remaining steps, but a request already running
+                # on an executor thread still completes in the background
+                for task in (s3_task, alex_task):
+                    task.cancel()
+                await asyncio.gather(s3_task, alex_task, return_exceptions=True)
+            
+            for step, task in (("s3_upload", s3_task), ("alexandria", alex_task)):
+                if not task.cancelled() and task.exception():
+                    raise task.exception()
             
             logger.info("[Upload] ✅ S3 upload successful")
             
             # Update label state to UPLOADED
             label.state = LabelState.UPLOADED
             amazon_return.internal_status = InternalStatus.LABEL_UPLOADED
-            self.db.flush()
-            
-            # ============================================================
-            # STEP 6: Get return details for customer_id, seller_id
-            # ============================================================
-            step = "return_details"
-            logger.info("[Upload] Step 6: Getting return details...")
-            
-            particulars = await self.amazon_client.get_return_details(
-                return_request_id=amazon_return.return_request_id,
-                marketplace_id=amazon_return.marketplace_id,
-            )
-            
-            if not particulars:
-                raise Exception("Failed to get return details")
-            
-            ret_req = particulars.get('returnRequest', {})
-            customer_id = ret_req.get('customerId') or amazon_return.customer_id
-            seller_id = MERCHANT_PARTY_ID  # Constant - no need to fetch from API
-            address_id = ret_req.get('returnAddressId') or amazon_return.return_address_id
             
-            if not customer_id:
-                raise Exception("Missing customerId for Alexandria upload")
-            
-            logger.info(f"[Upload] ✅ Customer: {customer_id}, Seller: {seller_id}")
-            
-            # ============================================================
-            # STEP 7: Get Alexandria args
-            # ============================================================
-            step = "alexandria_args"
-            logger.info("[Upload] Step 7: Getting Alexandria args...")
-            
-            alex_args = await self.amazon_client.get_alexandria_args(
-                customer_id=customer_id,
-                marketplace_id=amazon_return.marketplace_id or "",
-                seller_id=seller_id,
-                return_request_id=amazon_return.return_request_id,
-                csrf=csrf,
-            )
-            
-            if not alex_args:
-                raise Exception("Failed to get Alexandria args")
-            
-            logger.info("[Upload] ✅ Alexandria args obtained")
-            
-            # ============================================================
-            # STEP 8: Upload to Alexandria
-            # ============================================================
-            step = "alexandria_upload"
-            logger.info("[Upload] Step 8: Uploading to Alexandria...")
-            
-            alex_result = await self.amazon_client.alexandria_upload(
-                alex_args=alex_args,
-                label_png=label_png,
-                customer_id=customer_id,
-                seller_id=seller_id,
-                marketplace_id=amazon_return.marketplace_id or "",
-                return_request_id=amazon_return.return_request_id,
-                csrf=csrf,
-            )
-            
-            if not alex_result or not alex_result.get('success'):
-                raise Exception(f"Alexandria upload failed: {alex_result}")
-            
-            doc_version_id = alex_result.get('doc_version_id')
-            if not doc_version_id:
-                raise Exception("Alexandria upload succeeded but no document_version_id returned")
-            
-            logger.info(f"[Upload] ✅ Alexandria upload successful. DocId: {doc_version_id}")
+            step = "alexandria"
+            doc_version_id, address_id = alex_task.result()
+            seller_id = MERCHANT_PARTY_ID
             
             # ============================================================
             # STEP 9: Complete return
@@ -260,7 +411,7 @@ class UploadService:
             step = "complete_return"
             logger.info("[Upload] Step 9: Completing return...")
             
-            complete_success = await self.amazon_client.complete_return(
+            complete_success = await self._with_csrf_retry(lambda csrf: self.amazon_client.complete_return(
                 return_request_id=amazon_return.return_request_id,
                 marketplace_id=amazon_return.marketplace_id or "",
                 seller_id=seller_id,
@@ -268,7 +419,7 @@ class UploadService:
                 address_id=address_id,
                 tracking_id=label.tracking_number,
                 csrf=csrf,
-            )
+            ))
             
             if not complete_success:
                 raise Exception("Complete return request failed")
@@ -322,8 +473,6 @@ class UploadService:
                         self.db.add(new_label)
                         logger.info(f"[Upload] ✅ Created AmazonReturnLabel: carrier={label_details.get('carrierName')}, tracking={label_details.get('carrierTrackingId')}")
             
-            self.db.flush()
-            
             logger.info(f"[Upload] ========== UPLOAD COMPLETE: {amazon_return.return_request_id} ==========")
             return True
             
@@ -331,14 +480,12 @@ class UploadService:
             logger.error(f"[Upload] ❌ HTTP error at step '{step}' for {amazon_return.return_request_id}: {e}")
             amazon_return.mark_error(f"Upload failed at {step}: {str(e)}")
             label.state = LabelState.ERROR
-            self.db.flush()
             raise
             
         except Exception as e:
             logger.error(f"[Upload] ❌ Error at step '{step}' for {amazon_return.return_request_id}: {e}")
             amazon_return.mark_error(f"Upload failed at {step}: {str(e)}")
             label.state = LabelState.ERROR
-            self.db.flush()
             return False
             
     async def upload_all_pending(self) -> int:
@@ -349,30 +496,42 @@ class UploadService:
             Number of labels uploaded
         """
         # Get returns with generated labels that haven't been uploaded
+        # Labels are read for every return, so load them up front; raw_data
+        # (the full Amazon payload) isn't used by the upload flow
         returns = (
             self.db.query(AmazonReturn)
+            .options(
+                defer(AmazonReturn.raw_data),
+                selectinload(AmazonReturn.generated_label),
+                selectinload(AmazonReturn.amazon_label),
+            )
             .filter(AmazonReturn.internal_status == InternalStatus.LABEL_GENERATED)
             .all()
         )
         
         logger.info(f"Uploading labels for {len(returns)} returns")
         
-        uploaded_count = 0
+        # Each upload is ~7 sequential Amazon round trips; overlap a bounded
+        # number of returns instead of running them one after another
+        semaphore = asyncio.Semaphore(max(1, settings.UPLOAD_CONCURRENCY))
         
-        for amazon_return in returns:
-            try:
-                success = await self.upload_label(amazon_return)
-                if success:
-                    uploaded_count += 1
-            except HTTPError:
-                # HTTP errors are already logged and handled
-                continue
-            except Exception as e:
-                logger.error(f"Error uploading label for {amazon_return.return_request_id}: {e}")
-                amazon_return.mark_error(f"Upload error: {str(e)}")
-                continue
+        async def upload_one(amazon_return: AmazonReturn) -> bool:
+            async with semaphore:
+                try:
+                    return await self.upload_label(amazon_return)
+                except HTTPError:
+                    # HTTP errors are already logged and handled
+                    return False
+                except Exception as e:
+                    logger.error(f"Error uploading label for {amazon_return.return_request_id}: {e}")
+                    amazon_return.mark_error(f"Upload error: {str(e)}")
+                    return False
+        
+        results = await asyncio.gather(*(upload_one(r) for r in returns))
+        uploaded_count = sum(results)
                 
-        # Commit all changes
+        # Commit all changes - uploads only set ORM attributes, so this one
+        # flush+commit writes the whole batch
         self.db.commit()
         
         logger.info(f"Uploaded {uploaded_count} labels")
@@ -15,15 +15,35 @@ from io import BytesIO
 
 import pymupdf  # PyMuPDF
 
+from config import settings
+
 logger = logging.getLogger(__name__)
 
+# CSRF token patterns, tried in order (Amazon uses several formats)
+_CSRF_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        # Pattern from working amazon_bot: x-csrf-token' value='...'
+        r"x-csrf-token['\"]?\s*value=['\"]([^'\"]+)['\"]",
+        # Alternative: name="anti-csrftoken-a2z" value="..."
+        r'name=["\']?anti-csrftoken-a2z["\']?\s+value=["\']([^"\']+)["\']',
+        # JSON format in scripts
+        r'anti-csrftoken-a2z["\s:]+([a-zA-Z0-9\-_]+)',
+        r'"csrfToken"\s*:\s*"([^"]+)"',
+    )
+]
+# Every pattern contains "csrf" within a few characters of its start
+_CSRF_MARKER = re.compile("csrf", re.IGNORECASE)
+_CSRF_MARKER_LEAD = 32
+
 
 def convert_pdf_to_png_bytes(pdf_input) -> bytes:
     """
     Convert PDF to PNG bytes for Amazon Alexandria upload.
     
     Amazon requires labels to be uploaded as PNG images.
-    Uses PyMuPDF (fitz) for high-quality conversion at 300 DPI.
+    Uses PyMuPDF (fitz), rendering at settings.LABEL_PNG_DPI and - since
+    labels are black and white - as single-channel grayscale by default.
     
     Args:
         pdf_input: Either PDF file path (str) or PDF content as bytes
@@ -35,7 +55,8 @@ def convert_pdf_to_png_bytes(pdf_input) -> bytes:
         ValueError: If PDF has no pages or conversion fails
     """
     try:
-        # Open PDF from file path or bytes
+        # Open PDF from file path or bytes (bytes are read in place, not copied);
+        # the with-block frees MuPDF's buffers even when conversion fails
         if isinstance(pdf_input, str):
             # File path provided
             doc = pymupdf.open(pdf_input)
@@ -43,23 +64,24 @@ def convert_pdf_to_png_bytes(pdf_input) -> bytes:
             # Bytes provided
             doc = pymupdf.open(stream=pdf_input, filetype="pdf")
         
-        if len(doc) == 0:
-            raise ValueError("PDF has no pages")
-        
-        # Get first page
-        page = doc[0]
+        with doc:
+            if len(doc) == 0:
+                raise ValueError("PDF has no pages")
+            
+            # Get first page
+            page = doc[0]
+            
+            # Render cost and PNG size grow with DPI squared; gray is 1/3 the pixel bytes
+            dpi = settings.LABEL_PNG_DPI
+            zoom = dpi / 72
+            mat = pymupdf.Matrix(zoom, zoom)
+            colorspace = pymupdf.csGRAY if settings.LABEL_PNG_GRAYSCALE else pymupdf.csRGB
+            pix = page.get_pixmap(matrix=mat, colorspace=colorspace, alpha=False)
+            
+            # Get PNG bytes
+            png_bytes = pix.tobytes("png")
         
-        # Convert at 300 DPI for good quality
-        zoom = 300 / 72  # 300 DPI
-        mat = pymupdf.Matrix(zoom, zoom)
-        pix = page.get_pixmap(matrix=mat)
-        
-        # Get PNG bytes
-        png_bytes = pix.tobytes("png")
-        
-        doc.close()
-        
-        logger.info(f"[Utils] Converted PDF to PNG: {len(png_bytes)} bytes at 300 DPI")
+        logger.info(f"[Utils] Converted PDF to PNG: {len(png_bytes)} bytes at {dpi} DPI")
         return png_bytes
         
     except Exception as e:
@@ -79,19 +101,16 @@ def parse_csrf(html_text: str) -> Optional[str]:
     Returns:
         CSRF token string or None if not found
     """
-    patterns = [
-        # Pattern from working amazon_bot: x-csrf-token' value='...'
-        r"x-csrf-token['\"]?\s*value=['\"]([^'\"]+)['\"]",
-        # Alternative: name="anti-csrftoken-a2z" value="..."
-        r'name=["\']?anti-csrftoken-a2z["\']?\s+value=["\']([^"\']+)["\']',
-        # JSON format in scripts
-        r'anti-csrftoken-a2z["\s:]+([a-zA-Z0-9\-_]+)',
-        r'"csrfToken"\s*:\s*"([^"]+)"',
-    ]
+    # No match can start before the first "csrf", so skip the page up to it
+    marker = _CSRF_MARKER.search(html_text)
+    if not marker:
+        logger.warning("[Utils] CSRF token not found in response")
+        return None
+    start = max(0, marker.start() - _CSRF_MARKER_LEAD)
     
-    for pattern in patterns:
+    for pattern in _CSRF_PATTERNS:
         try:
-            match = re.search(pattern, html_text, re.IGNORECASE)
+            match = pattern.search(html_text, start)
             if match:
                 csrf = match.group(1)
                 logger.info(f"[Utils] CSRF token found: {csrf[:10]}...")
@@ -115,4 +134,4 @@ def generate_s3_key(return_request_id: str) -> str:
     Returns:
         Unique S3 key string
     """
-    return f"{return_request_id}-{uuid.uuid1()}"
+    return f"{return_request_id}-{uuid.uuid4()}"
@@ -32,6 +32,12 @@ from typing import Optional, Tuple, Dict, Any, List
 
 from config import settings
 
+# uvloop has no Windows build; fall back to the default asyncio loop there
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Setup logging
 logging.basicConfig(
     level=getattr(logging, settings.LOG_LEVEL),
@@ -86,7 +92,8 @@ class AmazonReturnWorker:
         self.poll_interval = poll_interval or settings.WORKER_POLL_INTERVAL
         self.running = True
         self.schedule_times = parse_schedule_times(settings.WORKER_SCHEDULE_TIMES)
-        self._last_scheduled_run: Optional[datetime] = None
+        # Computed once per run instead of matched minute-by-minute
+        self._next_scheduled: Optional[datetime] = get_next_scheduled_time(self.schedule_times)
         
         # Import here to avoid circular imports
         from db.postgres_session import get_session, test_connection as pg_test
@@ -99,24 +106,42 @@ class AmazonReturnWorker:
         """
         Poll PostgreSQL queue for pending PROCESS_RETURNS events.
         
+        Claims the oldest pending event in a single UPDATE ... RETURNING;
+        the FOR UPDATE SKIP LOCKED subquery keeps concurrent workers from
+        picking up the same row.
+        
         Returns:
             Tuple of (event_id, event_data) if found, (None, None) otherwise
         """
+        from sqlalchemy import select, update
         from models.worker_queue import WorkerQueueEvent
         
-        with self.get_session() as db:
-            event = db.query(WorkerQueueEvent).filter(
+        next_pending = (
+            select(WorkerQueueEvent.id)
+            .where(
                 WorkerQueueEvent.status == "PENDING",
                 WorkerQueueEvent.event_type == "PROCESS_RETURNS"
-            ).order_by(WorkerQueueEvent.created_at).first()
+            )
+            .order_by(WorkerQueueEvent.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        claim = (
+            update(WorkerQueueEvent)
+            .where(WorkerQueueEvent.id == next_pending)
+            .values(status="PROCESSING", started_at=datetime.utcnow())
+            .returning(WorkerQueueEvent.id, WorkerQueueEvent.data, WorkerQueueEvent.triggered_by)
+            .execution_options(synchronize_session=False)
+        )
+        
+        with self.get_session() as db:
+            row = db.execute(claim).first()
+            db.commit()
             
-            if event:
-                event.status = "PROCESSING"
-                event.started_at = datetime.utcnow()
-                db.commit()
-                
-                logger.info(f"🔔 Picked up event {event.id} (triggered by {event.triggered_by})")
-                return event.id, event.data
+            if row:
+                logger.info(f"🔔 Picked up event {row.id} (triggered by {row.triggered_by})")
+                return row.id, row.data
         
         return None, None
     
@@ -209,9 +234,13 @@ class AmazonReturnWorker:
         try:
             from services.return_flow import ReturnFlow
             
-            # Create progress callback bound to this event
-            def progress_callback(step_name: str, step_index: int, details: Dict = None):
-                self.update_event_progress(event_id, step_name, step_index, details)
+            # Create progress callback bound to this event (scheduled runs have
+            # no event to update, so ReturnFlow skips progress dispatch entirely)
+            if event_id:
+                def progress_callback(step_name: str, step_index: int, details: Dict = None):
+                    self.update_event_progress(event_id, step_name, step_index, details)
+            else:
+                progress_callback = None
             
             with self.get_session() as db:
                 flow = ReturnFlow(db, progress_callback=progress_callback)
@@ -231,28 +260,20 @@ class AmazonReturnWorker:
             return {"status": "error", "error": str(e)}
     
     def should_run_scheduled(self) -> bool:
-        """Check if it's time to run a scheduled cycle."""
-        if not self.schedule_times:
-            return False
-        
-        now = datetime.now()
-        current_minute = dt_time(now.hour, now.minute)
-        
-        # Check if current time matches any schedule time
-        for scheduled_time in self.schedule_times:
-            if (current_minute.hour == scheduled_time.hour and 
-                current_minute.minute == scheduled_time.minute):
-                
-                # Avoid running multiple times in the same minute
-                if self._last_scheduled_run:
-                    if (self._last_scheduled_run.hour == now.hour and 
-                        self._last_scheduled_run.minute == now.minute and
-                        self._last_scheduled_run.date() == now.date()):
-                        return False
-                
-                return True
+        """
+        Check if it's time to run a scheduled cycle.
         
-        return False
+        Due once the precomputed next run time has passed - a run whose
+        minute was spent on a queue-triggered cycle still happens, late.
+        """
+        return self._next_scheduled is not None and datetime.now() >= self._next_scheduled
+    
+    def idle_sleep_seconds(self, interval: float) -> float:
+        """Clamp an idle poll interval so the worker wakes when the next scheduled run is due."""
+        if self._next_scheduled:
+            until_scheduled = (self._next_scheduled - datetime.now()).total_seconds()
+            interval = min(interval, max(until_scheduled, 0))
+        return interval
     
     def test_connections(self) -> bool:
         """Test all database connections."""
@@ -284,9 +305,8 @@ class AmazonReturnWorker:
         logger.info(f"Poll Interval: {self.poll_interval}s")
         logger.info(f"Schedule Times: {', '.join(t.strftime('%H:%M') for t in self.schedule_times)}")
         
-        next_scheduled = get_next_scheduled_time(self.schedule_times)
-        if next_scheduled:
-            logger.info(f"Next Scheduled Run: {next_scheduled.strftime('%Y-%m-%d %H:%M')}")
+        if self._next_scheduled:
+            logger.info(f"Next Scheduled Run: {self._next_scheduled.strftime('%Y-%m-%d %H:%M')}")
         
         logger.info("=" * 80)
         
@@ -295,9 +315,14 @@ class AmazonReturnWorker:
             logger.error("Exiting due to connection failure")
             return
         
-        logger.info(f"Worker running. Polling every {self.poll_interval}s...")
+        logger.info(f"Worker running. Polling every {self.poll_interval}s "
+                    f"(backing off to {settings.WORKER_POLL_INTERVAL_MAX}s when idle)...")
         logger.info(f"Press Ctrl+C to stop")
         
+        # Idle polls double the interval up to WORKER_POLL_INTERVAL_MAX;
+        # any work snaps it back to the baseline
+        idle_interval = self.poll_interval
+        
         while self.running:
             try:
                 # Check for queue events (user-triggered)
@@ -306,20 +331,22 @@ class AmazonReturnWorker:
                 if event_id:
                     days = data.get("days", settings.WORKER_DAYS_BACK) if data else settings.WORKER_DAYS_BACK
                     await self.run_processing_cycle(days_back=days, event_id=event_id)
+                    idle_interval = self.poll_interval
                     continue  # Check for more events immediately
                 
                 # Check for scheduled run
                 if self.should_run_scheduled():
                     logger.info("⏰ Scheduled run triggered!")
-                    self._last_scheduled_run = datetime.now()
                     await self.run_processing_cycle(event_id=0)
                     
                     # Update next scheduled time
-                    next_scheduled = get_next_scheduled_time(self.schedule_times)
-                    if next_scheduled:
-                        logger.info(f"Next Scheduled Run: {next_scheduled.strftime('%Y-%m-%d %H:%M')}")
+                    self._next_scheduled = get_next_scheduled_time(self.schedule_times)
+                    if self._next_scheduled:
+                        logger.info(f"Next Scheduled Run: {self._next_scheduled.strftime('%Y-%m-%d %H:%M')}")
+                    idle_interval = self.poll_interval
                 
-                await asyncio.sleep(self.poll_interval)
+                await asyncio.sleep(self.idle_sleep_seconds(idle_interval))
+                idle_interval = min(idle_interval * 2, max(self.poll_interval, settings.WORKER_POLL_INTERVAL_MAX))
                 
             except KeyboardInterrupt:
                 logger.info("Shutdown requested")
@@ -328,6 +355,9 @@ class AmazonReturnWorker:
                 logger.error(f"Worker error: {e}", exc_info=True)
                 await asyncio.sleep(self.poll_interval)
         
+        from services.upload_service import shutdown_pdf_pool
+        shutdown_pdf_pool()
+        
         logger.info("Worker stopped")
     
     def stop(self):
@@ -351,7 +381,10 @@ def main():
     worker = AmazonReturnWorker()
     
     try:
-        asyncio.run(worker.run())
+        if uvloop:
+            uvloop.run(worker.run())
+        else:
+            asyncio.run(worker.run())
     except KeyboardInterrupt:
         logger.info("Worker stopped by user")
     except Exception as e: